@@ -0,0 +1,151 @@
+import re
+
+# Sections made of "Key:Value" lines
+KEY_VALUE_SECTIONS = ("General", "Editor", "Metadata", "Difficulty")
+
+TIMING_POINT = re.compile(r"(\d+),(-?\d+(?:\.\d+)?(?:E[+-]\d+)?),(\d+),(\d+),(\d+),(\d+),([01]),")
+SLIDER = re.compile(r"(-?\d+),(-?\d+),(\d+),(\d+),(\d+),([BPL](?:\|-?\d+:-?\d+)*),(\d+),(\d+(?:\.\d+)?)")
+
+
+class Line:
+
+    # <summary>
+    # A line of the file that is passed through as-is.
+    # Section: The name of the section the line is in, or None outside of any section.
+    # Line: The text of the line, including its line ending.
+    # </summary>
+    __slots__ = ('Section', 'Line')
+
+    def __init__(self, section, line):
+        self.Section = section
+        self.Line = line
+
+
+class SectionEnd(Line):
+
+    # <summary>
+    # The blank line that ends a section.
+    # </summary>
+    __slots__ = ()
+
+
+class Setting(Line):
+
+    # <summary>
+    # A "Key:Value" line of the [General], [Editor], [Metadata] or [Difficulty] sections.
+    # Value excludes the line ending.
+    # </summary>
+    __slots__ = ('Key', 'Value')
+
+    def __init__(self, section, line, key, value):
+        Line.__init__(self, section, line)
+        self.Key = key
+        self.Value = value
+
+
+class TimingPoint(Line):
+
+    # <summary>
+    # A line of the [TimingPoints] section.
+    # BeatLength, Meter, SampleSet, SampleIndex and Volume are kept as the text found in the file
+    # so that they can be written back unchanged. Rest is the remainder of the line after the
+    # uninherited field, including the line ending.
+    # </summary>
+    __slots__ = ('Time', 'BeatLength', 'Meter', 'SampleSet', 'SampleIndex', 'Volume', 'Uninherited', 'Rest')
+
+    def __init__(self, section, line, match):
+        Line.__init__(self, section, line)
+        self.Time = int(match.group(1))
+        self.BeatLength = match.group(2)
+        self.Meter = match.group(3)
+        self.SampleSet = match.group(4)
+        self.SampleIndex = match.group(5)
+        self.Volume = match.group(6)
+        self.Uninherited = match.group(7) == "1"
+        self.Rest = line[match.end():]
+
+
+class Slider(Line):
+
+    # <summary>
+    # A slider of the [HitObjects] section.
+    # Positions holds the (x, y) tuples of the curve points following the slider head.
+    # Rest is the remainder of the line after the length, including the line ending.
+    # </summary>
+    __slots__ = ('X', 'Y', 'Time', 'ObjectType', 'HitSound', 'SliderType', 'Positions', 'Slides', 'Length', 'Rest')
+
+    def __init__(self, section, line, match):
+        Line.__init__(self, section, line)
+        self.X = int(match.group(1))
+        self.Y = int(match.group(2))
+        self.Time = int(match.group(3))
+        self.ObjectType = int(match.group(4))
+        self.HitSound = int(match.group(5))
+        curve = match.group(6).split("|")
+        self.SliderType = curve[0]
+        self.Positions = []
+        for entry in curve[1:]:
+            x, y = entry.split(":")
+            self.Positions.append((int(x), int(y)))
+        self.Slides = int(match.group(7))
+        self.Length = float(match.group(8))
+        self.Rest = line[match.end():]
+
+
+# <summary>
+# Parses a .osu file in a single pass, yielding one typed record per line.
+# Lines are dispatched by the section they are in, so every line goes through at most one
+# precompiled pattern. A section ends at its header's first following blank line.
+# </summary>
+# <param name="lines">An iterable of lines including their line endings, such as an open text file.</param>
+# <returns>A generator of <see cref="Line"/> records (or subclasses of it), in file order.</returns>
+
+def ParseBeatmap(lines):
+    section = None
+
+    for line in lines:
+        if (line.strip() == ""):
+            if (section != None):
+                yield SectionEnd(section, line)
+                section = None
+            else:
+                yield Line(section, line)
+            continue
+
+        if (line.startswith("[")):
+            header = line.strip()
+            if (header.endswith("]")):
+                section = header[1:-1]
+                yield Line(section, line)
+                continue
+
+        yield parseLine(section, line)
+
+# <summary>
+# Parses a single non-blank line of the given section.
+# </summary>
+# <param name="section">The name of the section the line is in, or None.</param>
+# <param name="line">The text of the line, including its line ending.</param>
+# <returns>The record for the line.</returns>
+
+def parseLine(section, line):
+    if (section in KEY_VALUE_SECTIONS):
+        separator = line.find(":")
+        if (separator >= 0):
+            value = line[separator+1:]
+            if (value.endswith("\n")):
+                value = value[:-1]
+            return Setting(section, line, line[:separator], value)
+
+    elif (section == "TimingPoints"):
+        match = TIMING_POINT.match(line)
+        # Uninherited timing points cannot have a negative beat length
+        if (match and not (match.group(7) == "1" and match.group(2).startswith("-"))):
+            return TimingPoint(section, line, match)
+
+    elif (section == "HitObjects"):
+        match = SLIDER.match(line)
+        if (match):
+            return Slider(section, line, match)
+
+    return Line(section, line)
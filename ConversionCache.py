@@ -0,0 +1,113 @@
+import hashlib
+import os
+import pickle
+
+
+class ConversionCache:
+
+    # <summary>
+    # A content-addressed cache of conversion results on disk, shared between runs.
+    # Entries are pickled values stored under the hash of everything they depend on, in one folder per layer
+    # ("files" for whole converted files, "sliders" for chunks of converted sliders). Reading an entry refreshes
+    # its modification time, and when the cache grows over MaxBytes the least recently used entries are removed.
+    # Several processes may use the same folder: entries are written to a temporary file and renamed into place.
+    # Directory: The folder holding the cache.
+    # MaxBytes: The size the entries are kept under.
+    # The entries found and not are counted by the conversion, see <see cref="main.convertFile"/>, which also sees those of worker processes.
+    # </summary>
+    __slots__ = ('Directory', 'MaxBytes', 'size')
+
+    LAYERS = ("files", "sliders")
+
+    # <summary>
+    # Opens or creates the cache in a folder.
+    # </summary>
+    # <param name="directory">The folder holding the cache.</param>
+    # <param name="maxBytes">The size the entries are kept under.</param>
+    def __init__(self, directory, maxBytes=1 << 30):
+        self.Directory = directory
+        self.MaxBytes = maxBytes
+        for layer in self.LAYERS:
+            os.makedirs(os.path.join(directory, layer), exist_ok=True)
+        self.size = sum(entry[2] for entry in self.entries())
+
+    # <summary>
+    # Makes the key of an entry from everything its value depends on.
+    # </summary>
+    # <param name="parts">Values whose repr() identifies the entry, such as numbers, strings and tuples of them.</param>
+    # <returns>A hexadecimal SHA-256 digest.</returns>
+    @staticmethod
+    def Key(*parts):
+        return hashlib.sha256(repr(parts).encode("utf8")).hexdigest()
+
+    # <summary>
+    # Looks up an entry.
+    # </summary>
+    # <param name="layer">The layer of the entry, one of <see cref="LAYERS"/>.</param>
+    # <param name="key">The key of the entry, see <see cref="Key"/>.</param>
+    # <returns>The value of the entry, or None if there is none.</returns>
+    def Get(self, layer, key):
+        path = self.path(layer, key)
+        try:
+            with open(path, 'rb') as FD:
+                value = pickle.load(FD)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Missing, evicted by another process meanwhile, or unreadable
+            return None
+        return value
+
+    # <summary>
+    # Stores an entry, replacing any entry with the same key, and evicts the least recently used entries if the cache grew too big.
+    # </summary>
+    # <param name="layer">The layer of the entry, one of <see cref="LAYERS"/>.</param>
+    # <param name="key">The key of the entry, see <see cref="Key"/>.</param>
+    # <param name="value">The value to store, which must be picklable.</param>
+    def Put(self, layer, key, value):
+        path = self.path(layer, key)
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, 'wb') as FDW:
+            pickle.dump(value, FDW, protocol=pickle.HIGHEST_PROTOCOL)
+        self.size = self.size+os.path.getsize(temporary)
+        os.replace(temporary, path)
+
+        if (self.size > self.MaxBytes):
+            self.evict()
+
+    # <summary>
+    # Removes the least recently used entries until the cache is under nine tenths of MaxBytes, so that eviction
+    # does not happen again on the next Put. The running size only counts what this process has written,
+    # so it is recounted from the folder first.
+    # </summary>
+    def evict(self):
+        entries = sorted(self.entries())
+        self.size = sum(entry[2] for entry in entries)
+        for mtime, path, size in entries:
+            if (self.size <= self.MaxBytes*9//10):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.size = self.size-size
+
+    # <summary>
+    # Lists the entries of all layers, skipping files that are still being written.
+    # </summary>
+    # <returns>A list of (modification time, path, size) tuples.</returns>
+    def entries(self):
+        entries = []
+        for layer in self.LAYERS:
+            with os.scandir(os.path.join(self.Directory, layer)) as it:
+                for entry in it:
+                    if entry.name.endswith(".tmp"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, entry.path, stat.st_size))
+        return entries
+
+    def path(self, layer, key):
+        return os.path.join(self.Directory, layer, key)
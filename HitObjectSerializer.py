@@ -0,0 +1,36 @@
+import src.Profiler as Profiler
+
+# The size of the write buffer of every converted file. Slider lines are hundreds of kilobytes long,
+# so a large buffer turns them into few system calls.
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# <summary>
+# Turns control points into the "x:y|x:y|..." text of a slider line in one formatting operation,
+# instead of converting every coordinate to text on its own.
+# </summary>
+# <param name="points">An (n, 2) integer array of control points.</param>
+# <returns>The control points joined by "|", each written as "x:y".</returns>
+
+def SerializeControlPoints(points):
+    if (len(points) == 0):
+        return ""
+    flat = points.ravel().tolist()
+    return ("%d:%d|"*len(points) % tuple(flat))[:-1]
+
+# <summary>
+# Makes the HitObject line of a converted slider, a linear slider through all of its control points.
+# </summary>
+# <param name="xpos">The x position of the slider head.</param>
+# <param name="ypos">The y position of the slider head.</param>
+# <param name="time">The time the slider starts at.</param>
+# <param name="objtype">The object type field.</param>
+# <param name="hitSound">The hit sound field.</param>
+# <param name="points">The control points following the slider head, see <see cref="SerializeControlPoints"/>.</param>
+# <param name="slides">The amount of slides.</param>
+# <param name="length">The length of the slider.</param>
+# <param name="rest">The remainder of the line after the length, including the line ending.</param>
+# <returns>The line of text.</returns>
+
+@Profiler.Profiled
+def SerializeSlider(xpos, ypos, time, objtype, hitSound, points, slides, length, rest):
+    return "%d,%d,%d,%d,%d,L|%s,%d,%f%s" % (xpos, ypos, time, objtype, hitSound, SerializeControlPoints(points), slides, length, rest)
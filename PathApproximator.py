@@ -1,14 +1,49 @@
 import numpy
+import src.Profiler as Profiler
+
+# The tolerances osu! flattens paths with, in osu!pixels. Coarser tolerances give fewer vertices.
+BEZIER_TOLERANCE = 0.25
+CIRCULAR_ARC_TOLERANCE = 0.1
 
 # <summary>
 # Creates a piecewise-linear approximation of a bezier curve, by adaptively repeatedly subdividing
 # the control points until their approximation error vanishes below a given threshold.
 # </summary>
 # <param name="controlPoints">The control points as a list of numpy arrays (vectors).</param>
+# <param name="tolerance">The threshold, see <see cref="bezierIsFlatEnough"/>.</param>
 # <returns>A list of vectors representing the piecewise-linear approximation.</returns>
 
-def ApproximateBezier(controlPoints):
-    return ApproximateBSpline(controlPoints)
+@Profiler.Profiled
+def ApproximateBezier(controlPoints, tolerance=BEZIER_TOLERANCE):
+    return ApproximateBSpline(controlPoints, tolerance)
+
+# <summary>
+# Creates piecewise-linear approximations of many bezier curves with the same amount of control points at once.
+# Each curve is approximated exactly like <see cref="ApproximateBezier"/> would.
+# </summary>
+# <param name="curves">A (k, count, 2) array holding the control points of k curves.</param>
+# <param name="tolerance">The threshold, see <see cref="bezierIsFlatEnough"/>.</param>
+# <returns>The approximations of all curves packed into one (m, 2) array, and the k+1 offsets at which
+# the approximation of each curve starts and ends.</returns>
+
+@Profiler.Profiled
+def ApproximateBezierBatch(curves, tolerance=BEZIER_TOLERANCE):
+    curves = numpy.asarray(curves, dtype=numpy.float64)
+    leaves, leafKeys = bezierFlattenLeaves(curves, tolerance)
+    approximations = bezierApproximateBatch(leaves)
+    
+    # Every leaf contributes the same amount of points; each curve additionally ends with its last control point.
+    counts = numpy.bincount(leafKeys.astype(numpy.int64), minlength=len(curves))*approximations.shape[1]+1
+    offsets = numpy.zeros(len(curves)+1, dtype=numpy.int64)
+    numpy.cumsum(counts, out=offsets[1:])
+    
+    isLast = numpy.zeros(offsets[-1], dtype=bool)
+    isLast[offsets[1:]-1] = True
+    
+    output = numpy.empty((offsets[-1], 2), dtype=numpy.float64)
+    output[~isLast] = approximations.reshape(-1, 2)
+    output[isLast] = curves[:, -1]
+    return output, offsets
 
 # <summary>
 # Creates a piecewise-linear approximation of a clamped uniform B-spline with polynomial order p,
@@ -16,95 +51,77 @@ def ApproximateBezier(controlPoints):
 # subdividing those until their approximation error vanishes below a given threshold.
 # Retains previous bezier approximation functionality when p is 0 or too large to create knots.
 # Algorithm unsuitable for large values of p with many knots.
+# The control points are held in a contiguous (n, 2) float64 array and every curve of the same
+# subdivision depth is processed at once (see <see cref="bezierFlatten"/>). The result matches the
+# original per-point implementation up to floating-point rounding (well below 1e-9 osu!pixels).
 # </summary>
-# <param name="controlPoints">The control points as a list of numpy arrays (vectors).</param>
+# <param name="controlPoints">The control points as a list of numpy arrays (vectors) or an (n, 2) array.</param>
 # <param name="p">The polynomial order.</param>
-# <returns>A list of vectors representing the piecewise-linear approximation.</returns>
+# <param name="tolerance">The threshold, see <see cref="bezierIsFlatEnough"/>.</param>
+# <returns>An (m, 2) array of vectors representing the piecewise-linear approximation.</returns>
 
-def ApproximateBSpline(controlPoints):
+@Profiler.Profiled
+def ApproximateBSpline(controlPoints, tolerance=BEZIER_TOLERANCE):
     p=0
-    output = []
-    n = len(controlPoints)-1
+    points = numpy.array(controlPoints, dtype=numpy.float64).reshape(-1, 2)
+    n = len(points)-1
     
     if (n<0):
-        return output
-    
-    toFlatten = []
-    freeBuffers = []
-    points = []
-    for i in range(0, len(controlPoints)):
-        points.append(controlPoints[i])
+        return numpy.empty((0, 2), dtype=numpy.float64)
     
     if (p>0 and p<n):
         # Subdivide B-spline into bezier control points at knots
+        toFlatten = numpy.empty((n-p+1, p+1, 2), dtype=numpy.float64)
         for i in range(0, n-p):
-            subBezier = [0]*(p+1)
-            subBezier[0] = points[i]
+            toFlatten[i, 0] = points[i]
             
             # Destructively insert the knot p-1 times via Boehm's algorithm.
             for j in range(0, p-1):
-                subBezier[j+1] = points[i+1]
+                toFlatten[i, j+1] = points[i+1]
                 
                 for k in range(1,p-j):
                     l = min((k,n-p-i))
                     points[i+k] = (l*points[i+k]+points[i+k+1])/(l+1)
                 
-            subBezier[p] = points[i+1]
-            toFlatten.append(subBezier)
+            toFlatten[i, p] = points[i+1]
         
-        toFlatten.append(points[(n-p):])
-        # Reverse the stack so elements can be accessed in order.
-        toFlatten = toFlatten.reverse()
+        toFlatten[n-p] = points[(n-p):]
     else:
         # B-spline subdivision unnecessary, degenerate to single bezier.
         p = n
-        toFlatten.append(points)
-        
-    # "toFlatten" contains all the curves which are not yet approximated well enough.
-    # We use a stack to emulate recursion without the risk of running into a stack overflow.
-    # (More specifically, we iteratively and adaptively refine our curve with a
-    # <a href="https://en.wikipedia.org/wiki/Depth-first_search">Depth-first search</a>
-    # over the tree resulting from the subdivisions we make.)
-        
-    subdivisionBuffer1 = [0]*(p+1)
-    subdivisionBuffer2 = [0]*(p*2+1)
-    leftChild = subdivisionBuffer2
-    
-    while (len(toFlatten) > 0):
-        parent = toFlatten.pop()
-        if (bezierIsFlatEnough(parent)):
-            # If the control points we currently operate on are sufficiently "flat", we use
-            # an extension to De Casteljau's algorithm to obtain a piecewise-linear approximation
-            # of the bezier curve represented by our control points, consisting of the same amount
-            # of points as there are control points
-            bezierApproximate(parent, output, subdivisionBuffer1, subdivisionBuffer2, p+1)
-            
-            freeBuffers.append(parent)
-            continue
-        
-        # If we do not yet have a sufficiently "flat" (in other words, detailed) approximation we keep
-        # subdividing the curve we are currently operating on.
-        rightChild = freeBuffers.pop() if len(freeBuffers) > 0 else [0]*(p+1)
-        bezierSubdivide(parent, leftChild, rightChild, subdivisionBuffer1, p+1)
-        
-        # We re-use the buffer of the parent for one of the children, so that we save one allocation per iteration.
-        for i in range(0, p+1):
-            parent[i] = leftChild[i]
-        
-        toFlatten.append(rightChild)
-        toFlatten.append(parent)
-        
-    output.append(controlPoints[n])
-    return output
+        toFlatten = points[None, :, :]
+    
+    output = bezierFlatten(toFlatten, tolerance)
+    return numpy.concatenate((output, points[n:]))
 
 # <summary>
 # Creates a piecewise-linear approximation of a circular arc curve.
 # </summary>
 # <param name="controlPoints">The control points as a list of numpy arrays (vectors).</param>
-# <returns>A list of vectors representing the piecewise-linear approximation.</returns>
+# <param name="tolerance">The largest distance, in osu!pixels, the approximation may be from the arc.</param>
+# <returns>An (n, 2) array of vectors representing the piecewise-linear approximation, or an empty list if no circular arc
+# can be fit to the control points.</returns>
+
+@Profiler.Profiled
+def ApproximateCircularArc(controlPoints, tolerance=CIRCULAR_ARC_TOLERANCE):
+    arc = ApproximateCircularArcWithLengths(controlPoints, tolerance)
+    return [] if arc == None else arc[0]
+
+# <summary>
+# Creates a piecewise-linear approximation of a circular arc curve together with the distance along it at each of its points.
+# All points are made at once from evenly spaced angles. Every chord between them spans the same angle, so they all have
+# the same length, 2r*sin(angle/2), and the distances are known without measuring the chords; they differ from the
+# measured ones by floating-point rounding only.
+# </summary>
+# <param name="controlPoints">The control points as a list of numpy arrays (vectors).</param>
+# <param name="tolerance">The largest distance, in osu!pixels, the approximation may be from the arc.</param>
+# <returns>A tuple (points, cumulativeLengths) of an (n, 2) array of vectors representing the piecewise-linear approximation and
+# a float64 array holding the distance along it at each vector, or None if no circular arc can be fit to the control points.</returns>
 
-def ApproximateCircularArc(controlPoints):
-    circular_arc_tolerance = 0.1
+@Profiler.Profiled
+def ApproximateCircularArcWithLengths(controlPoints, tolerance=CIRCULAR_ARC_TOLERANCE):
+    if not (tolerance > 0):
+        raise ValueError("The tolerance of a circular arc must be positive, not %r" % (tolerance))
     
     a = controlPoints[0]
     b = controlPoints[1]
@@ -116,8 +133,8 @@ def ApproximateCircularArc(controlPoints):
     
     # If we have a degenerate triangle where a side-length is almost zero, then give up and fall
     # back to a more numerically stable method.
-    if (numpy.isclose(aSq, 0) or numpy.isclose(bSq, 0) or numpy.isclose(cSq, 0)):
-        return []
+    if (almostZero(aSq) or almostZero(bSq) or almostZero(cSq)):
+        return None
     
     s = aSq*(bSq+cSq-aSq)
     t = bSq*(aSq+cSq-bSq)
@@ -127,8 +144,8 @@ def ApproximateCircularArc(controlPoints):
     
     # If we have a degenerate triangle with an almost-zero size, then give up and fall
     # back to a more numerically stable method.
-    if (numpy.isclose(sumvar, 0)):
-        return []
+    if (almostZero(sumvar)):
+        return None
 
     centre = (s*a+t*b+u*c)/sumvar
     dA = a-centre
@@ -158,16 +175,21 @@ def ApproximateCircularArc(controlPoints):
     # is: 2 * Math.Acos(1 - TOLERANCE / r)
     # The special case is required for extremely short sliders where the radius is smaller than
     # the tolerance. This is a pathological rather than a realistic case.
-    amountPoints = 2 if 2*r <= circular_arc_tolerance else max((2, numpy.ceil(thetaRange/(2*numpy.arccos(1-circular_arc_tolerance/r))).astype(numpy.int64)))
-    
-    output = []
-    for i in range(0, amountPoints):
-        fract = i/(amountPoints-1)
-        theta = thetaStart + dirvar*fract*thetaRange
-        o = numpy.array((numpy.cos(theta), numpy.sin(theta)))*r
-        output.append(centre+o)
-        
-    return output
+    amountPoints = 2 if 2*r <= tolerance else max((2, numpy.ceil(thetaRange/(2*numpy.arccos(1-tolerance/r))).astype(numpy.int64)))
+    
+    fract = numpy.arange(amountPoints)/(amountPoints-1)
+    theta = thetaStart + dirvar*fract*thetaRange
+    output = centre+numpy.stack((numpy.cos(theta), numpy.sin(theta)), axis=1)*r
+    
+    chord = 2*r*numpy.sin(thetaRange/(amountPoints-1)/2)
+    return output, numpy.arange(amountPoints)*chord
+
+# <summary>
+# Tells whether a number is close to zero like numpy.isclose(value, 0) does with its default tolerances, without its array overhead.
+# </summary>
+
+def almostZero(value):
+    return abs(value) <= 1e-8
 
 # <summary>
 # Creates a piecewise-linear approximation of a linear curve.
@@ -176,6 +198,7 @@ def ApproximateCircularArc(controlPoints):
 # <param name="controlPoints">The control points as a list of numpy arrays (vectors).</param>
 # <returns>A list of vectors representing the piecewise-linear approximation.</returns>
 
+@Profiler.Profiled
 def ApproximateLinear(controlPoints):
     result = []
     
@@ -191,17 +214,12 @@ def ApproximateLinear(controlPoints):
 #       need to have a denser approximation to be more "flat".
 # </summary>
 # <param name="controlPoints">The control points as a list of numpy arrays (vectors).</param>
+# <param name="tolerance">The threshold, in osu!pixels: half the largest 2nd order difference of the control points that is flat enough.</param>
 # <returns>Whether the control points are flat enough.</returns>
 
-def bezierIsFlatEnough(controlPoints):
-    bezier_tolerance=0.25
-    
-    for i in range(1, len(controlPoints)-1):
-        testvec = controlPoints[i-1]-2*controlPoints[i]+controlPoints[i+1]
-        if (numpy.dot(testvec,testvec) > bezier_tolerance*bezier_tolerance*4):
-            return False
-        
-    return True
+def bezierIsFlatEnough(controlPoints, tolerance=BEZIER_TOLERANCE):
+    curves = numpy.asarray(controlPoints, dtype=numpy.float64).reshape(1, -1, 2)
+    return bool(bezierIsFlatEnoughBatch(curves, tolerance)[0])
 
 # <summary>
 # Subdivides n control points representing a bezier curve into 2 sets of n control points, each
@@ -215,17 +233,12 @@ def bezierIsFlatEnough(controlPoints):
 # <param name="count">The number of control points in the original list.</param>
 
 def bezierSubdivide(controlPoints, l, r, subdivisionBuffer, count):
-    midpoints = subdivisionBuffer
+    curves = numpy.asarray(controlPoints[:count], dtype=numpy.float64).reshape(1, count, 2)
+    left, right = bezierSubdivideBatch(curves)
     
     for i in range(0, count):
-        midpoints[i] = controlPoints[i]
-        
-    for i in range(0, count):
-        l[i] = midpoints[0]
-        r[count-i-1] = midpoints[count-i-1]
-        
-        for j in range(0, count-i-1):
-            midpoints[j] = (midpoints[j]+midpoints[j+1])/2
+        l[i] = left[0, i]
+        r[i] = right[0, i]
             
 # <summary>
 # This uses <a href="https://en.wikipedia.org/wiki/De_Casteljau%27s_algorithm">De Casteljau's algorithm</a> to obtain an optimal
@@ -238,18 +251,113 @@ def bezierSubdivide(controlPoints, l, r, subdivisionBuffer, count):
 # <param name="subdivisionBuffer2">The second buffer containing the current subdivision state.</param>
 
 def bezierApproximate(controlPoints, output, subdivisionBuffer1, subdivisionBuffer2, count):
-    l = subdivisionBuffer2
-    r = subdivisionBuffer1
+    curves = numpy.asarray(controlPoints[:count], dtype=numpy.float64).reshape(1, count, 2)
     
-    bezierSubdivide(controlPoints, l, r, subdivisionBuffer1, count)
+    for p in bezierApproximateBatch(curves)[0]:
+        output.append(p)
+
+# <summary>
+# Flattens a stack of bezier curves sharing the same number of control points.
+# </summary>
+# <param name="curves">A (k, count, 2) array of bezier control points, in path order.</param>
+# <param name="tolerance">The threshold, see <see cref="bezierIsFlatEnough"/>.</param>
+# <returns>An (m, 2) array of vectors approximating the curves, excluding the final control point.</returns>
+
+def bezierFlatten(curves, tolerance=BEZIER_TOLERANCE):
+    leaves, leafKeys = bezierFlattenLeaves(curves, tolerance)
+    return bezierApproximateBatch(leaves).reshape(-1, 2)
+
+# <summary>
+# Subdivides a stack of bezier curves sharing the same number of control points until all of them are flat enough.
+# Instead of the depth-first search over the subdivision tree used by osu!framework, the tree is
+# walked one depth at a time: all curves of a depth are tested and subdivided with whole-array
+# operations, and the leaves are put back into depth-first (left-to-right) order at the end by the
+# parameter value at which they start. Every leaf goes through exactly the same arithmetic as in
+# the recursive formulation.
+# </summary>
+# <param name="curves">A (k, count, 2) array of bezier control points, in path order.</param>
+# <param name="tolerance">The threshold, see <see cref="bezierIsFlatEnough"/>.</param>
+# <returns>The flat (l, count, 2) leaves in path order, and the parameter value each of them starts at.
+# The integer part of that value is the index of the curve the leaf belongs to.</returns>
+
+def bezierFlattenLeaves(curves, tolerance=BEZIER_TOLERANCE):
+    # Curves would be subdivided forever
+    if not (tolerance > 0):
+        raise ValueError("The tolerance of a bezier curve must be positive, not %r" % (tolerance))
+    
+    curves = numpy.asarray(curves, dtype=numpy.float64)
+    keys = numpy.arange(len(curves), dtype=numpy.float64)
+    width = 1.0
     
-    for i in range(0, count-1):
-        l[count+i] = r[i+1]
+    leaves = [curves[:0]]
+    leafKeys = [keys[:0]]
+    
+    while (len(curves) > 0):
+        flat = bezierIsFlatEnoughBatch(curves, tolerance)
+        if (flat.any()):
+            leaves.append(curves[flat])
+            leafKeys.append(keys[flat])
+            curves = curves[~flat]
+            keys = keys[~flat]
+            if (len(curves) == 0):
+                break
         
-    output.append(controlPoints[0])
+        # Children of a curve start at the parent's parameter value and halfway through its interval.
+        width = width/2
+        leftChildren, rightChildren = bezierSubdivideBatch(curves)
+        curves = numpy.concatenate((leftChildren, rightChildren))
+        keys = numpy.concatenate((keys, keys+width))
     
-    for i in range(1, count-1):
-        index = 2*i
-        p = 0.25*(l[index-1]+2*l[index]+l[index+1])
-        output.append(p)
+    leaves = numpy.concatenate(leaves)
+    leafKeys = numpy.concatenate(leafKeys)
+    order = numpy.argsort(leafKeys, kind='stable')
+    return leaves[order], leafKeys[order]
+
+# <summary>
+# Vectorized <see cref="bezierIsFlatEnough"/> over a stack of curves.
+# </summary>
+# <param name="curves">A (k, count, 2) array of bezier control points.</param>
+# <param name="tolerance">The threshold, see <see cref="bezierIsFlatEnough"/>.</param>
+# <returns>A boolean array of length k telling which curves are flat enough.</returns>
+
+def bezierIsFlatEnoughBatch(curves, tolerance=BEZIER_TOLERANCE):
+    testvec = curves[:, :-2]-2*curves[:, 1:-1]+curves[:, 2:]
+    sqLength = testvec[..., 0]*testvec[..., 0]+testvec[..., 1]*testvec[..., 1]
+    return ~(sqLength > tolerance*tolerance*4).any(axis=1)
+
+# <summary>
+# Vectorized <see cref="bezierSubdivide"/> over a stack of curves.
+# </summary>
+# <param name="curves">A (k, count, 2) array of bezier control points.</param>
+# <returns>The (k, count, 2) control points of the left and of the right halves.</returns>
+
+def bezierSubdivideBatch(curves):
+    count = curves.shape[1]
+    midpoints = curves.copy()
+    l = numpy.empty_like(curves)
+    r = numpy.empty_like(curves)
     
+    for i in range(0, count):
+        l[:, i] = midpoints[:, 0]
+        r[:, count-i-1] = midpoints[:, count-i-1]
+        midpoints[:, :count-i-1] = (midpoints[:, :count-i-1]+midpoints[:, 1:count-i])/2
+    
+    return l, r
+
+# <summary>
+# Vectorized <see cref="bezierApproximate"/> over a stack of curves.
+# </summary>
+# <param name="curves">A (k, count, 2) array of bezier control points.</param>
+# <returns>A (k, max(count-1, 1), 2) array holding the approximation of every curve.</returns>
+
+def bezierApproximateBatch(curves):
+    count = curves.shape[1]
+    output = numpy.empty((len(curves), max((count-1, 1)), 2), dtype=numpy.float64)
+    output[:, 0] = curves[:, 0]
+    
+    if (count > 2):
+        l, r = bezierSubdivideBatch(curves)
+        l = numpy.concatenate((l, r[:, 1:]), axis=1)
+        output[:, 1:] = 0.25*(l[:, 1:2*count-4:2]+2*l[:, 2:2*count-3:2]+l[:, 3:2*count-2:2])
+    
+    return output
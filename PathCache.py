@@ -0,0 +1,92 @@
+import collections
+
+
+class PathCache:
+
+    # <summary>
+    # A bounded least recently used memo of flattened slider paths, shared by the sliders of a process.
+    # Paths are stored relative to their first control point, so a shape that is repeated anywhere on the playfield
+    # is only flattened once, unless they are anchored to where they are (see <see cref="SliderPath.ComputeMany"/>).
+    # A path flattened relative to its first control point matches the one flattened in place only up to floating-point
+    # rounding along bezier segments, so every path goes through the same relative flattening whether it is a hit or not.
+    # The stored arrays are read-only because every hit hands out the same arrays.
+    # MaxEntries: The amount of paths kept.
+    # Hits, Misses: The amount of lookups that found or did not find a path.
+    # </summary>
+    __slots__ = ('MaxEntries', 'Hits', 'Misses', 'paths')
+
+    def __init__(self, MaxEntries=4096):
+        self.MaxEntries = MaxEntries
+        self.Hits = 0
+        self.Misses = 0
+        self.paths = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.paths)
+
+    # <summary>
+    # Makes the key of a path from the positions of its control points relative to the first one and their types,
+    # and the tolerances it is flattened with.
+    # The expected distance is not part of it: paths are stored before they are shortened or lengthened to it.
+    # </summary>
+    # <param name="controlPoints">The <see cref="PathControlPoint"/>s of the path.</param>
+    # <param name="anchored">Whether the path is only the same as paths of the same shape at the same position,
+    # in which case the positions are kept as they are.</param>
+    # <param name="tolerances">The tolerances the path is flattened with, such as a (bezier, circular arc) tuple.</param>
+    @staticmethod
+    def Key(controlPoints, anchored=False, tolerances=None):
+        if (len(controlPoints) == 0):
+            return ()
+        hx, hy = (0, 0) if anchored else controlPoints[0].Position.tolist()
+        key = [anchored, tolerances]
+        for c in controlPoints:
+            x, y = c.Position.tolist()
+            key.append((x-hx, y-hy, c.Type))
+        return tuple(key)
+
+    # <summary>
+    # Looks up a path, marking it as the most recently used one.
+    # </summary>
+    # <param name="key">The key of the path, see <see cref="Key"/>.</param>
+    # <returns>A tuple (path, lengths) of read-only arrays like <see cref="Put"/> stores, or None.</returns>
+    def Get(self, key):
+        entry = self.paths.get(key)
+        if (entry == None):
+            self.Misses = self.Misses+1
+            return None
+
+        self.paths.move_to_end(key)
+        self.Hits = self.Hits+1
+        return entry
+
+    # <summary>
+    # Stores a path, evicting the least recently used one if the cache is full.
+    # </summary>
+    # <param name="key">The key of the path, see <see cref="Key"/>.</param>
+    # <param name="path">The (n, 2) array of vertices relative to the first control point. It is copied and made read-only.</param>
+    # <param name="lengths">An array holding the length of the segment leading to every vertex where the approximation knows it,
+    # NaN elsewhere, see <see cref="SliderPath.ComputeMany"/>. It is copied and made read-only.</param>
+    def Put(self, key, path, lengths):
+        path = path.copy()
+        path.flags.writeable = False
+        lengths = lengths.copy()
+        lengths.flags.writeable = False
+        self.paths[key] = (path, lengths)
+        self.paths.move_to_end(key)
+        while (len(self.paths) > self.MaxEntries):
+            self.paths.popitem(last=False)
+
+    # <summary>
+    # Forgets every path and resets the counts of hits and misses.
+    # </summary>
+    def Clear(self):
+        self.paths.clear()
+        self.Hits = 0
+        self.Misses = 0
+
+    # <summary>
+    # The share of lookups that found a path, 0 if there were none.
+    # </summary>
+    def HitRate(self):
+        lookups = self.Hits+self.Misses
+        return 0 if lookups == 0 else self.Hits/lookups
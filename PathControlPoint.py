@@ -6,14 +6,13 @@ class PathControlPoint:
     PERFECT = 1
     BEZIER = 2
     
-    
-    Position = numpy.array((0,0), dtype='int64')
-    
-    Type = None
+    # Position: The position of the control point, as a numpy array (vector).
+    # Type: The type of the segment starting at this control point, or None if it continues the previous segment.
+    __slots__ = ('Position', 'Type')
     
     def __init__(self, position, typevar=None):
         self.Position = position
         self.Type = typevar
         
     def Equals(self, other):
-        return (self.Position == other.Position and self.Type == other.Type)
\ No newline at end of file
+        return (numpy.array_equal(self.Position, other.Position) and self.Type == other.Type)
\ No newline at end of file
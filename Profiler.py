@@ -0,0 +1,108 @@
+import contextlib
+import functools
+import time
+
+# The profiler the stages of the running conversion are added to, or None when nothing is being profiled.
+# Profiled code only looks this up, so leaving profiling off costs a global lookup per profiled call.
+ACTIVE = None
+
+
+class Profiler:
+
+    # <summary>
+    # Timings and counts of the stages of a conversion, see <see cref="Profiling"/>.
+    # The time of a stage includes the time of the stages it runs, and stages run by worker processes add up their time.
+    # Calls: The amount of times each stage ran, by stage name.
+    # Seconds: The time spent in each stage, by stage name.
+    # Counts: Amounts of things processed, such as sliders or bytes written, by name.
+    # </summary>
+    __slots__ = ('Calls', 'Seconds', 'Counts')
+
+    def __init__(self):
+        self.Calls = {}
+        self.Seconds = {}
+        self.Counts = {}
+
+    # <summary>
+    # Records that a stage ran.
+    # </summary>
+    # <param name="stage">The name of the stage.</param>
+    # <param name="seconds">How long it took.</param>
+    def Add(self, stage, seconds):
+        self.Calls[stage] = self.Calls.get(stage, 0)+1
+        self.Seconds[stage] = self.Seconds.get(stage, 0.0)+seconds
+
+    # <summary>
+    # Adds to a count.
+    # </summary>
+    # <param name="name">The name of the count.</param>
+    # <param name="amount">The amount to add.</param>
+    def Count(self, name, amount=1):
+        self.Counts[name] = self.Counts.get(name, 0)+amount
+
+    # <summary>
+    # Adds the timings and counts of a report, such as one made in another process, to this profiler.
+    # </summary>
+    # <param name="report">A dict made by <see cref="Report"/>.</param>
+    def Merge(self, report):
+        for stage, timing in report["stages"].items():
+            self.Calls[stage] = self.Calls.get(stage, 0)+timing["calls"]
+            self.Seconds[stage] = self.Seconds.get(stage, 0.0)+timing["seconds"]
+        for name, amount in report["counts"].items():
+            self.Count(name, amount)
+
+    # <summary>
+    # Makes a JSON-serializable summary of the timings and counts.
+    # </summary>
+    # <returns>A dict {"stages": {stage: {"calls": n, "seconds": s}}, "counts": {name: amount}}, stages sorted by name.</returns>
+    def Report(self):
+        stages = dict((stage, {"calls": self.Calls[stage], "seconds": self.Seconds[stage]}) for stage in sorted(self.Calls))
+        return {"stages": stages, "counts": dict(sorted(self.Counts.items()))}
+
+# <summary>
+# Profiles everything run inside a with block, in this process.
+# The previously active profiler, if any, is restored afterwards and does not see the stages of the block.
+# </summary>
+# <returns>A context manager giving the new <see cref="Profiler"/>.</returns>
+
+@contextlib.contextmanager
+def Profiling():
+    global ACTIVE
+    previous = ACTIVE
+    ACTIVE = Profiler()
+    try:
+        yield ACTIVE
+    finally:
+        ACTIVE = previous
+
+# <summary>
+# Makes a function a stage of its own when profiling: every call adds its time to <see cref="ACTIVE"/>.
+# </summary>
+# <param name="function">The function to profile.</param>
+# <returns>The function, wrapped.</returns>
+
+def Profiled(function):
+    # Methods are named after their class, functions after their module
+    stage = function.__qualname__ if "." in function.__qualname__ else function.__module__.rsplit(".", 1)[-1]+"."+function.__qualname__
+
+    @functools.wraps(function)
+    def profiled(*args, **kwargs):
+        profiler = ACTIVE
+        if (profiler == None):
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.Add(stage, time.perf_counter()-start)
+    return profiled
+
+# <summary>
+# Adds to a count of <see cref="ACTIVE"/>, if profiling.
+# </summary>
+# <param name="name">The name of the count.</param>
+# <param name="amount">The amount to add.</param>
+
+def Count(name, amount=1):
+    if (ACTIVE != None):
+        ACTIVE.Count(name, amount)
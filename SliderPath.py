@@ -1,27 +1,24 @@
 import numpy
-import bisect
 import src.PathApproximator as PathApproximator
+from src.PathCache import PathCache
 from src.PathControlPoint import PathControlPoint
+import src.Profiler as Profiler
 
 
 class SliderPath:
 
-    # <summary>
-    # The user-set distance of the path. If non-null, <see cref="Distance"/> will match this value,
-    # and the path will be shortened/lengthened to match this length.
-    # </summary>   
-    ExpectedDistance = None
+    # The state of a path lives on the instance only, so that any number of paths can be held,
+    # cached or computed in parallel without sharing storage.
+    __slots__ = ('ExpectedDistance', 'ControlPoints', 'calculatedPath', 'cumulativeLength', 'calculatedLength')
     
     # <summary>
-    # The control points of the path
+    # ExpectedDistance: The user-set distance of the path. If non-null, <see cref="Distance"/> will match this value,
+    # and the path will be shortened/lengthened to match this length.
+    # ControlPoints: The control points of the path.
+    # calculatedPath: The vertices of the flattened path, as an (n, 2) float64 array.
+    # cumulativeLength: The distance along the path at each vertex, as a float64 array.
+    # calculatedLength: The distance of the path prior to lengthening/shortening.
     # </summary>
-    ControlPoints = []
-    
-    calculatedPath = []
-    cumulativeLength = []
-    
-    calculatedLength = 0
-    
     
     # <summary>
     # Creates a new <see cref="SliderPath"/> initialised with a list of control points.
@@ -29,11 +26,13 @@ class SliderPath:
     # <param name="controlPoints">An optional set of <see cref="PathControlPoint"/>s to initialise the path with.</param>
     # <param name="expectedDistance">A user-set distance of the path that may be shorter or longer than the true distance between all control points.
     # The path will be shortened/lengthened to match this length. If null, the path will use the true distance between all control points.</param>
-    def __init__(self, ControlPoints, ExpectedDistance=None):
+    # <param name="cache">An optional <see cref="PathCache"/> to reuse the flattened path of the same shape from.</param>
+    # <param name="bezierTolerance">The tolerance bezier segments are flattened with, see <see cref="PathApproximator.ApproximateBezier"/>.</param>
+    # <param name="circularArcTolerance">The tolerance circular arcs are flattened with, see <see cref="PathApproximator.ApproximateCircularArc"/>.</param>
+    def __init__(self, ControlPoints, ExpectedDistance=None, cache=None, bezierTolerance=PathApproximator.BEZIER_TOLERANCE, circularArcTolerance=PathApproximator.CIRCULAR_ARC_TOLERANCE):
         self.ControlPoints = ControlPoints
         self.ExpectedDistance = ExpectedDistance
-        self.calculatePath()
-        self.calculateLength()
+        self.calculateLength(self.calculatePath(cache, (bezierTolerance, circularArcTolerance)))
         
     # <summary>
     # The distance of the path after lengthening/shortening to account for <see cref="ExpectedDistance"/>.
@@ -49,28 +48,20 @@ class SliderPath:
     
     # <summary>
     # Computes the slider path until a given progress that ranges from 0 (beginning of the slider)
-    # to 1 (end of the slider) and stores the generated path in the given list.
+    # to 1 (end of the slider).
     # </summary>
-    # <param name="path">The list to be filled with the computed path.</param>
     # <param name="p0">Start progress. Ranges from 0 (beginning of the slider) to 1 (end of the slider).</param>
     # <param name="p1">End progress. Ranges from 0 (beginning of the slider) to 1 (end of the slider).</param>
-    def GetPathToProgress(self, path, p0, p1):
+    # <returns>An (m, 2) array: the position at p0, the vertices between both progresses, and the position at p1.</returns>
+    def GetPathToProgress(self, p0, p1):
         d0 = self.progressToDistance(p0)
         d1 = self.progressToDistance(p1)
         
-        path.clear()
-        
-        i = 0
-        while (i<len(self.calculatedPath) and self.cumulativeLength[i] < d0):
-            i = i+1
-        
-        path.append(self.interpolateVertices(i, d0))
+        cumulativeLength = self.cumulativeLength[:len(self.calculatedPath)]
+        start = int(numpy.searchsorted(cumulativeLength, d0, side='left'))
+        end = max((start, int(numpy.searchsorted(cumulativeLength, d1, side='right'))))
         
-        while (i<len(self.calculatedPath) and self.cumulativeLength[i] <= d1):
-            path.append(self.calculatedPath[i])
-            i = i+1
-        
-        path.append(self.interpolateVertices(i, d1))
+        return numpy.concatenate(([self.interpolateVertices(start, d0)], self.calculatedPath[start:end], [self.interpolateVertices(end, d1)]))
     
     # <summary>
     # Computes the position on the slider at a given progress that ranges from 0 (beginning of the path)
@@ -82,17 +73,331 @@ class SliderPath:
         d = self.progressToDistance(progress)
         return self.interpolateVertices(self.indexOfDistance(d), d)
     
+    # <summary>
+    # Computes the positions on the slider at many progresses at once, see <see cref="PositionAt"/>.
+    # </summary>
+    # <param name="progresses">An array of progresses, each ranging from 0 (beginning of the path) to 1 (end of the path).</param>
+    # <returns>An (m, 2) float64 array holding the position at every progress.</returns>
+    def PositionsAt(self, progresses):
+        path = self.calculatedPath
+        distances = numpy.clip(numpy.asarray(progresses, dtype=numpy.float64).reshape(-1), 0, 1)*self.Distance()
+        if (len(path) == 0):
+            return numpy.zeros((len(distances), 2), dtype=numpy.float64)
+        if (len(path) == 1):
+            return numpy.repeat(path[:1], len(distances), axis=0)
+        
+        indices = numpy.searchsorted(self.cumulativeLength, distances, side='left')
+        segment = numpy.clip(indices, 1, len(path)-1)
+        p0 = path[segment-1]
+        p1 = path[segment]
+        d0 = self.cumulativeLength[segment-1]
+        d1 = self.cumulativeLength[segment]
+        
+        # Segments whose ends are almost at the same distance give their first vertex, like interpolateVertices
+        close = numpy.abs(d1-d0) <= 1e-8+1e-5*numpy.abs(d1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            w = (distances-d0)/(d1-d0)
+        positions = p0+(p1-p0)*w[:, None]
+        positions[close] = p0[close]
+        positions[indices <= 0] = path[0]
+        positions[indices >= len(path)] = path[-1]
+        return positions
+    
+    # <summary>
+    # Computes the rounded positions the sliderball snaps to at frameCount+1 evenly spaced progresses, from 0 to 1.
+    # Every progress is assigned to the segment its distance falls in; the frames assigned to a segment are spread
+    # evenly over it, ending on its last vertex. Frames assigned to the first vertex all land on it.
+    # </summary>
+    # <param name="frameCount">The amount of frames the path is travelled in.</param>
+    # <returns>A tuple (x, y) of int64 arrays of length frameCount+1.</returns>
+    @Profiler.Profiled
+    def SamplePositions(self, frameCount):
+        if (frameCount <= 0):
+            raise ValueError("A path cannot be travelled in %d frames" % (frameCount))
+        
+        path = self.calculatedPath
+        distances = numpy.clip(numpy.arange(frameCount+1)/frameCount, 0, 1)*self.Distance()
+        indices = numpy.searchsorted(self.cumulativeLength, distances, side='left')
+        
+        # The position of each frame among the frames of its segment, counting from 1
+        counts = numpy.bincount(indices, minlength=len(self.cumulativeLength))
+        steps = numpy.arange(len(indices))-numpy.searchsorted(indices, indices, side='left')+1
+        
+        positions = numpy.empty((len(indices), 2), dtype=numpy.float64)
+        first = indices == 0
+        positions[first] = path[0]
+        indices = indices[~first]
+        p0 = path[indices-1]
+        positions[~first] = p0+(path[indices]-p0)*steps[~first][:, None]/counts[indices][:, None]
+        
+        if (not numpy.isfinite(positions).all()):
+            raise ValueError("The path has no finite position at some frame")
+        positions = numpy.rint(positions).astype(numpy.int64)
+        return positions[:, 0], positions[:, 1]
+    
+    
+    # <summary>
+    # Creates a <see cref="SliderPath"/> from a path and cumulative lengths that have already been computed,
+    # for example one of the paths returned by <see cref="ComputeMany"/>.
+    # </summary>
+    # <param name="controlPoints">The <see cref="PathControlPoint"/>s the path was computed from.</param>
+    # <param name="expectedDistance">The user-set distance the path was computed with.</param>
+    # <param name="calculatedPath">The vertices of the flattened path.</param>
+    # <param name="cumulativeLength">The distance along the path at each vertex.</param>
+    # <param name="calculatedLength">The distance of the path prior to lengthening/shortening.</param>
+    @classmethod
+    def FromComputed(cls, ControlPoints, ExpectedDistance, calculatedPath, cumulativeLength, calculatedLength):
+        path = cls.__new__(cls)
+        path.ControlPoints = ControlPoints
+        path.ExpectedDistance = ExpectedDistance
+        path.calculatedPath = calculatedPath
+        path.cumulativeLength = cumulativeLength
+        path.calculatedLength = calculatedLength
+        return path
+    
+    # <summary>
+    # Computes the flattened paths and cumulative lengths of many sliders at once.
+    # Bezier segments of all paths are grouped by their amount of control points and flattened together,
+    # and the lengths of all paths are computed and trimmed to their expected distance with whole-array operations.
+    # Paths are flattened relative to their first control point, which is what lets a cached path be reused for the same
+    # shape anywhere else. That gives the same vertices as flattening in place for linear segments. Bezier segments are
+    # subdivided from other coordinates, so their vertices differ from those flattened in place by floating-point rounding
+    # (around 1e-13 osu!pixels for beziers of 8 or more control points). A circular arc's approximation depends on the
+    # rounding of its centre and radius, and so even on its amount of vertices, so paths that may contain one are anchored:
+    # flattened where they are and only reused there.
+    # A <see cref="SliderPath"/> made with a cache flattens its path here too, and one made without flattens it in place.
+    # Both measure their paths with <see cref="measurePaths"/>, taking the segment lengths along circular arcs from their
+    # approximation (see <see cref="PathApproximator.ApproximateCircularArcWithLengths"/>), and measuring a path does not
+    # depend on the paths measured with it, so a path made with a cache is identical to the same path of any batch.
+    # </summary>
+    # <param name="controlPointSets">A list holding a list of <see cref="PathControlPoint"/>s for every path.</param>
+    # <param name="expectedDistances">A list holding the user-set distance of every path, or None.</param>
+    # <param name="cache">An optional <see cref="PathCache"/> to reuse flattened paths from and store new ones in.
+    # The paths found in it and not are counted as path_cache_hits and path_cache_misses in the active <see cref="Profiler"/>.</param>
+    # <param name="bezierTolerance">The tolerance bezier segments are flattened with, see <see cref="PathApproximator.ApproximateBezier"/>.</param>
+    # <param name="circularArcTolerance">The tolerance circular arcs are flattened with, see <see cref="PathApproximator.ApproximateCircularArc"/>.</param>
+    # <returns>A tuple (offsets, calculatedPaths, cumulativeLengths, calculatedLengths). The vertices of path i are
+    # calculatedPaths[offsets[i]:offsets[i+1]] and the distances along it are cumulativeLengths[offsets[i]:offsets[i+1]].
+    # calculatedLengths holds the distance of every path prior to lengthening/shortening.</returns>
+    @staticmethod
+    @Profiler.Profiled
+    def ComputeMany(controlPointSets, expectedDistances, cache=None, bezierTolerance=PathApproximator.BEZIER_TOLERANCE, circularArcTolerance=PathApproximator.CIRCULAR_ARC_TOLERANCE):
+        vertices, owners, offsets, knownLengths = SliderPath.flattenPaths(controlPointSets, cache, bezierTolerance, circularArcTolerance)
+        expected = numpy.array([numpy.nan if d == None else d for d in expectedDistances], dtype=numpy.float64)
+        return SliderPath.measurePaths(vertices, owners, offsets, expected, knownLengths)
+    
+    # <summary>
+    # Flattens many paths at once, see <see cref="ComputeMany"/>.
+    # </summary>
+    # <returns>A tuple (vertices, owners, offsets, knownLengths) like <see cref="measurePaths"/> takes: the vertices of every path
+    # one path after the other, the index of the path of every vertex, where the vertices of every path start, and the length of
+    # the segment leading to every vertex where the approximation knows it, NaN elsewhere.</returns>
+    @staticmethod
+    def flattenPaths(controlPointSets, cache, bezierTolerance, circularArcTolerance):
+        count = len(controlPointSets)
+        heads = numpy.zeros((count, 2), dtype=numpy.float64)
+        
+        # Split every path into its segments, remembering where the approximation of each segment comes from.
+        pieces = []
+        pieceLengths = []
+        pieceOwners = []
+        beziers = {}
+        hits = 0
+        misses = []
+        for owner in range(0, count):
+            controlPoints = controlPointSets[owner]
+            if (len(controlPoints) == 0):
+                continue
+            anchored = any(c.Type == PathControlPoint.PERFECT for c in controlPoints)
+            head = numpy.zeros(2, dtype=numpy.int64) if anchored else controlPoints[0].Position
+            heads[owner] = head
+            
+            if (cache != None):
+                key = PathCache.Key(controlPoints, anchored, (bezierTolerance, circularArcTolerance))
+                entry = cache.Get(key)
+                if (entry != None):
+                    pieces.append(entry[0])
+                    pieceLengths.append(entry[1])
+                    pieceOwners.append(owner)
+                    hits = hits+1
+                    continue
+                misses.append((owner, key))
+            
+            start = 0
+            for i in range(0, len(controlPoints)):
+                if (controlPoints[i].Type == None and i < len(controlPoints)-1):
+                    continue
+                
+                segmentVertices = [c.Position-head for c in controlPoints[start:(i+1)]]
+                segmentType = controlPoints[start].Type
+                if (segmentType == None):
+                    segmentType = PathControlPoint.LINEAR
+                
+                subpath = None
+                lengths = None
+                if (segmentType == PathControlPoint.LINEAR):
+                    subpath = numpy.array(segmentVertices, dtype=numpy.float64)
+                elif (segmentType == PathControlPoint.PERFECT and len(segmentVertices) == 3):
+                    arc = PathApproximator.ApproximateCircularArcWithLengths(segmentVertices, circularArcTolerance)
+                    if (arc != None):
+                        subpath = numpy.asarray(arc[0], dtype=numpy.float64)
+                        # The segment into the first vertex of a sub path comes from the previous one
+                        lengths = numpy.full(len(subpath), numpy.nan)
+                        lengths[1:] = numpy.diff(arc[1])
+                
+                if (subpath is None):
+                    # Bezier segments are flattened together below; keep a placeholder for their approximation.
+                    beziers.setdefault(len(segmentVertices), []).append((len(pieces), segmentVertices))
+                elif (lengths is None):
+                    lengths = numpy.full(len(subpath), numpy.nan)
+                    
+                pieces.append(subpath)
+                pieceLengths.append(lengths)
+                pieceOwners.append(owner)
+                start = i
+        
+        for segments in beziers.values():
+            approximations, segmentOffsets = PathApproximator.ApproximateBezierBatch([vertices for _, vertices in segments], bezierTolerance)
+            for j in range(0, len(segments)):
+                pieces[segments[j][0]] = approximations[segmentOffsets[j]:segmentOffsets[j+1]]
+                pieceLengths[segments[j][0]] = numpy.full(segmentOffsets[j+1]-segmentOffsets[j], numpy.nan)
+        
+        if (len(pieces) > 0):
+            vertices = numpy.concatenate(pieces)
+            knownLengths = numpy.concatenate(pieceLengths)
+            owners = numpy.repeat(numpy.array(pieceOwners, dtype=numpy.int64), [len(piece) for piece in pieces])
+        else:
+            vertices = numpy.empty((0, 2), dtype=numpy.float64)
+            knownLengths = numpy.empty(0, dtype=numpy.float64)
+            owners = numpy.empty(0, dtype=numpy.int64)
+        
+        # Consecutive duplicate vertices of a path are only stored once.
+        # A removed vertex equals the one before it, so the vertex after it is as far from that one.
+        keep = numpy.ones(len(vertices), dtype=bool)
+        keep[1:] = ~(SliderPath.sameAsPrevious(vertices) & (owners[1:] == owners[:-1]))
+        vertices = vertices[keep]
+        knownLengths = knownLengths[keep]
+        owners = owners[keep]
+        
+        offsets = numpy.zeros(count+1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(owners, minlength=count), out=offsets[1:])
+        starts = offsets[:-1]
+        ends = offsets[1:]
+        
+        for owner, key in misses:
+            cache.Put(key, vertices[starts[owner]:ends[owner]], knownLengths[starts[owner]:ends[owner]])
+        if (cache != None):
+            Profiler.Count("path_cache_hits", hits)
+            Profiler.Count("path_cache_misses", len(misses))
+        return vertices+heads[owners], owners, offsets, knownLengths
+    
+    # <summary>
+    # Measures flattened paths and shortens or lengthens them to their expected distance, all at once.
+    # The distances along every path are summed from its own start, in the same order as for the path on its own, so that
+    # they do not depend on the paths measured with it. Paths are summed together in groups of similar amounts of vertices,
+    # as the rows of an array padded with zeros after their end (see <see cref="cumulativeSums"/>).
+    # </summary>
+    # <param name="vertices">An (n, 2) array holding the vertices of every path, one path after the other. Vertices are moved in place.</param>
+    # <param name="owners">An int64 array holding the index of the path of every vertex.</param>
+    # <param name="offsets">An int64 array of length count+1: the vertices of path i are vertices[offsets[i]:offsets[i+1]]. It is updated in place.</param>
+    # <param name="expected">A float64 array holding the expected distance of every path, NaN for none.</param>
+    # <param name="knownLengths">An optional float64 array holding the length of the segment leading to every vertex where it is
+    # already known, NaN for those to measure. The first vertex of every path is at distance 0 whatever it holds.</param>
+    # <returns>A tuple (offsets, calculatedPaths, cumulativeLengths, calculatedLengths), see <see cref="ComputeMany"/>.</returns>
+    @staticmethod
+    def measurePaths(vertices, owners, offsets, expected, knownLengths=None):
+        count = len(offsets)-1
+        starts = offsets[:-1]
+        ends = offsets[1:]
+        nonEmpty = ends > starts
+        
+        # Segment lengths, with the first vertex of every path starting at distance 0
+        diff = numpy.zeros_like(vertices)
+        diff[1:] = vertices[1:]-vertices[:-1]
+        diff[starts[nonEmpty]] = 0
+        segmentLengths = numpy.sqrt(diff[:, 0]*diff[:, 0]+diff[:, 1]*diff[:, 1])
+        if (knownLengths is not None):
+            known = ~numpy.isnan(knownLengths)
+            known[starts[nonEmpty]] = False
+            segmentLengths[known] = knownLengths[known]
+        
+        cumulativeLengths = SliderPath.cumulativeSums(segmentLengths, starts, ends)
+        
+        calculatedLengths = numpy.zeros(count, dtype=numpy.float64)
+        calculatedLengths[nonEmpty] = cumulativeLengths[ends[nonEmpty]-1]
+        
+        trimmed = nonEmpty & ~numpy.isnan(expected) & (calculatedLengths != expected)
+        
+        # Trimmed paths end at the first vertex past the last distance that stays below the expected distance.
+        isLast = numpy.zeros(len(vertices), dtype=bool)
+        isLast[ends[nonEmpty]-1] = True
+        expectedPerVertex = numpy.repeat(expected, ends-starts)
+        pathEnd = numpy.bincount(owners[~isLast & (cumulativeLengths < expectedPerVertex)], minlength=count)
+        
+        newCounts = ends-starts
+        newCounts[trimmed] = pathEnd[trimmed]+1
+        
+        # The direction of the segment to shorten or lengthen
+        moved = numpy.flatnonzero(trimmed & (pathEnd > 0))
+        endIndex = starts[moved]+pathEnd[moved]
+        direction = vertices[endIndex]-vertices[endIndex-1]
+        direction = direction/numpy.sqrt(direction[:, 0]*direction[:, 0]+direction[:, 1]*direction[:, 1])[:, None]
+        vertices[endIndex] = vertices[endIndex-1]+direction*(expected[moved]-cumulativeLengths[endIndex-1])[:, None]
+        cumulativeLengths[endIndex] = expected[moved]
+        
+        keep = (numpy.arange(len(vertices))-starts[owners]) < newCounts[owners]
+        offsets[1:] = numpy.cumsum(newCounts)
+        return offsets, vertices[keep], cumulativeLengths[keep], calculatedLengths
+    
+    # <summary>
+    # Sums values cumulatively within consecutive runs, restarting at the start of each, like one numpy.cumsum per run.
+    # Runs whose lengths lie between the same powers of two are summed as the rows of one 2D array, padded with zeros
+    # after their end so that the padding cannot change the sums, which keeps the padding below half of the array.
+    # </summary>
+    # <param name="values">A float64 array holding the values of every run, one run after the other.</param>
+    # <param name="starts">An int64 array holding where every run starts.</param>
+    # <param name="ends">An int64 array holding where every run ends.</param>
+    # <returns>A float64 array holding the sum of every value and those before it in its run.</returns>
+    @staticmethod
+    def cumulativeSums(values, starts, ends):
+        sums = numpy.zeros(len(values), dtype=numpy.float64)
+        lengths = ends-starts
+        groups = numpy.frexp(lengths)[1]
+        for group in numpy.unique(groups[lengths > 0]).tolist():
+            runs = numpy.flatnonzero(groups == group)
+            columns = numpy.arange(lengths[runs].max())
+            valid = columns[None, :] < lengths[runs][:, None]
+            indices = (starts[runs][:, None]+columns[None, :])[valid]
+            padded = numpy.zeros(valid.shape, dtype=numpy.float64)
+            padded[valid] = values[indices]
+            sums[indices] = numpy.cumsum(padded, axis=1)[valid]
+        return sums
     
-    def calculatePath(self):
-        self.calculatedPath.clear()
+    # <summary>
+    # Flattens the control points into <see cref="calculatedPath"/>.
+    # </summary>
+    # <param name="cache">An optional <see cref="PathCache"/> to reuse the flattened path from.</param>
+    # <param name="tolerances">A tuple (bezier tolerance, circular arc tolerance), see <see cref="ComputeMany"/>.</param>
+    # <returns>A float64 array holding, for every vertex but the first, the length of the segment leading to it
+    # where the approximation knows it (see <see cref="PathApproximator.ApproximateCircularArcWithLengths"/>), NaN elsewhere.</returns>
+    @Profiler.Profiled
+    def calculatePath(self, cache=None, tolerances=(PathApproximator.BEZIER_TOLERANCE, PathApproximator.CIRCULAR_ARC_TOLERANCE)):
         if (len(self.ControlPoints) == 0):
-            return
+            self.calculatedPath = numpy.empty((0, 2), dtype=numpy.float64)
+            return numpy.empty(0, dtype=numpy.float64)
+        
+        if (cache != None):
+            # Cached paths are flattened relative to the first control point, which flattenPaths takes care of
+            self.calculatedPath, _, _, knownLengths = SliderPath.flattenPaths([self.ControlPoints], cache, *tolerances)
+            return knownLengths[1:]
         
         vertices = []
         for i in range(0, len(self.ControlPoints)):
             vertices.append(self.ControlPoints[i].Position)
             
         start = 0
+        subPaths = []
+        subLengths = []
         
         for i in range(0, len(self.ControlPoints)):
             if (self.ControlPoints[i].Type == None and i < len(self.ControlPoints)-1):
@@ -104,65 +409,77 @@ class SliderPath:
             if (segmentType == None):
                 segmentType = PathControlPoint.LINEAR
                 
-            for t in self.calculateSubPath(segmentVertices, segmentType):
-                if (len(self.calculatedPath) == 0 or not numpy.array_equal(self.calculatedPath[-1],t,equal_nan=True)):
-                    self.calculatedPath.append(t)
+            subpath, cumulativeLength = self.calculateSubPath(segmentVertices, segmentType, tolerances)
+            subPaths.append(numpy.asarray(subpath, dtype=numpy.float64).reshape(-1, 2))
+            
+            # The segment into the first vertex of a sub path comes from the previous one
+            lengths = numpy.full(len(subPaths[-1]), numpy.nan)
+            if (cumulativeLength is not None):
+                lengths[1:] = numpy.diff(cumulativeLength)
+            subLengths.append(lengths)
                 
             # Start the new segment at the current vertex
             start = i
+        
+        path = numpy.concatenate(subPaths)
+        keep = numpy.ones(len(path), dtype=bool)
+        keep[1:] = ~SliderPath.sameAsPrevious(path)
+        self.calculatedPath = path[keep]
+        
+        # A removed vertex equals the one before it, so the vertex after it is as far from that one
+        return numpy.concatenate(subLengths)[keep][1:]
+    
+    # <summary>
+    # Tells which vertices of a path are equal to the vertex before them, treating NaN coordinates as equal.
+    # </summary>
+    # <param name="vertices">An (n, 2) array of vertices.</param>
+    # <returns>A boolean array of length n-1 whose i-th element tells whether vertex i+1 equals vertex i.</returns>
+    @staticmethod
+    def sameAsPrevious(vertices):
+        same = (vertices[1:] == vertices[:-1]) | (numpy.isnan(vertices[1:]) & numpy.isnan(vertices[:-1]))
+        return same.all(axis=1)
             
-    def calculateSubPath(self, subControlPoints, typevar):
+    # <summary>
+    # Approximates a segment of the path.
+    # </summary>
+    # <returns>A tuple (vertices, cumulativeLength): the approximation and the distance along it at each vertex, or None
+    # for the distances if the approximation does not know them.</returns>
+    def calculateSubPath(self, subControlPoints, typevar, tolerances):
         if (typevar == PathControlPoint.LINEAR):
-            return PathApproximator.ApproximateLinear(subControlPoints)
+            return PathApproximator.ApproximateLinear(subControlPoints), None
         elif (typevar == PathControlPoint.PERFECT and len(subControlPoints) == 3):
-            subpath = PathApproximator.ApproximateCircularArc(subControlPoints)
+            arc = PathApproximator.ApproximateCircularArcWithLengths(subControlPoints, tolerances[1])
             
             # If for some reason a circular arc could not be fit to the 3 given points, fall back to a numerically stable bezier approximation.
-            if (len(subpath) != 0):
-                return subpath
+            if (arc != None):
+                return arc
             
-        return PathApproximator.ApproximateBezier(subControlPoints)
+        return PathApproximator.ApproximateBezier(subControlPoints, tolerances[0]), None
     
-    def calculateLength(self):
-        self.calculatedLength = 0
-        self.cumulativeLength.clear()
-        self.cumulativeLength.append(0)
+    # <summary>
+    # Computes <see cref="cumulativeLength"/> and <see cref="calculatedLength"/>, then shortens or lengthens the path to <see cref="ExpectedDistance"/>.
+    # </summary>
+    # <param name="segmentLengths">The lengths of the segments leading to every vertex but the first that are already known,
+    # NaN for those to measure, see <see cref="calculatePath"/>.</param>
+    @Profiler.Profiled
+    def calculateLength(self, segmentLengths):
+        path = self.calculatedPath
+        if (len(path) == 0):
+            self.cumulativeLength = numpy.zeros(1, dtype=numpy.float64)
+            self.calculatedLength = 0
+            return
         
-        for i in range(0, len(self.calculatedPath)-1):
-            diff = self.calculatedPath[i+1] - self.calculatedPath[i]
-            self.calculatedLength = self.calculatedLength + numpy.linalg.norm(diff)
-            self.cumulativeLength.append(self.calculatedLength)
-            
-        if (self.ExpectedDistance != None):
-            expectedDistance = self.ExpectedDistance
-            if (self.calculatedLength != expectedDistance):
-                # The last length is always incorrect
-                del self.cumulativeLength[-1]
-                
-                pathEndIndex = len(self.calculatedPath)-1
-                
-                if (self.calculatedLength > expectedDistance):
-                    # The path will be shortened further, in which case we should trim any more unnecessary lengths and their associated path segments
-                    while (len(self.cumulativeLength) > 0 and self.cumulativeLength[-1] >= expectedDistance):
-                        del self.cumulativeLength[-1]
-                        del self.calculatedPath[pathEndIndex]
-                        pathEndIndex = pathEndIndex-1
-                
-                if (pathEndIndex <= 0):
-                    # The expected distance is negative or zero
-                    # TODO: Perhaps negative path lengths should be disallowed altogether
-                    self.cumulativeLength.append(0)
-                    return
-                
-                # The direction of the segment to shorten or lengthen
-                dir = self.calculatedPath[pathEndIndex]-self.calculatedPath[pathEndIndex-1]
-                dir = dir/numpy.linalg.norm(dir)
-                
-                self.calculatedPath[pathEndIndex] = self.calculatedPath[pathEndIndex-1]+dir*(expectedDistance-self.cumulativeLength[-1])
-                self.cumulativeLength.append(expectedDistance)
+        # A single path is measured the same way as a batch of them
+        knownLengths = numpy.concatenate(([numpy.nan], segmentLengths))
+        expected = numpy.array([numpy.nan if self.ExpectedDistance == None else self.ExpectedDistance], dtype=numpy.float64)
+        offsets = numpy.array([0, len(path)], dtype=numpy.int64)
+        owners = numpy.zeros(len(path), dtype=numpy.int64)
+        
+        offsets, self.calculatedPath, self.cumulativeLength, calculatedLengths = SliderPath.measurePaths(path, owners, offsets, expected, knownLengths)
+        self.calculatedLength = calculatedLengths[0]
     
     def indexOfDistance(self, d):
-        return bisect.bisect_left(self.cumulativeLength, d)
+        return int(numpy.searchsorted(self.cumulativeLength, d, side='left'))
     
     def progressToDistance(self, progress):
         return max((0, min((progress, 1))))*self.Distance()
@@ -184,7 +501,8 @@ class SliderPath:
         d1 = self.cumulativeLength[i]
         
         # Avoid division by an almost-zero number in case two points are extremely close to each other.
-        if (numpy.isclose(d0, d1)):
+        # (the tolerances of numpy.isclose, without its overhead on scalars)
+        if (abs(d1-d0) <= 1e-8+1e-5*abs(d1)):
             return p0
         
         w = (d-d0)/(d1-d0)
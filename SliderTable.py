@@ -0,0 +1,118 @@
+import numpy
+import src.HitObjectSerializer as HitObjectSerializer
+
+
+class SliderTable:
+
+    # <summary>
+    # Converted sliders, stored by column: one fixed-width array per field, and the control points of all sliders in one shared buffer.
+    # X, Y, Time, ObjectType, HitSound, Slides: int64 arrays holding the fields of the original slider lines.
+    # Length: An int64 array holding the length of every converted slider.
+    # BeatLength: A float64 array holding the beat length of the timing point every converted slider needs.
+    # Rest: A list holding the remainder of every slider line after the length, including the line ending.
+    # ControlPoints: An (n, 2) int64 array holding the control points following the head of every slider, one slider after the other.
+    # Offsets: An int64 array of length count+1: the control points of slider i are ControlPoints[Offsets[i]:Offsets[i+1]].
+    # </summary>
+    __slots__ = ('X', 'Y', 'Time', 'ObjectType', 'HitSound', 'Slides', 'Length', 'BeatLength', 'Rest', 'ControlPoints', 'Offsets')
+
+    def __init__(self, X, Y, Time, ObjectType, HitSound, Slides, Length, BeatLength, Rest, ControlPoints, Offsets):
+        self.X = X
+        self.Y = Y
+        self.Time = Time
+        self.ObjectType = ObjectType
+        self.HitSound = HitSound
+        self.Slides = Slides
+        self.Length = Length
+        self.BeatLength = BeatLength
+        self.Rest = Rest
+        self.ControlPoints = ControlPoints
+        self.Offsets = Offsets
+
+    def __len__(self):
+        return len(self.Time)
+
+    # <summary>
+    # Makes the table of converted sliders from the sliders they were converted from.
+    # </summary>
+    # <param name="pending">A list holding the <see cref="main.processSlider"/> arguments of every slider.</param>
+    # <param name="converted">A list holding what <see cref="main.processSlider"/> returned for every slider, in the order of pending.</param>
+    @staticmethod
+    def FromConverted(pending, converted):
+        offsets = numpy.zeros(len(converted)+1, dtype=numpy.int64)
+        numpy.cumsum([len(c[0]) for c in converted], out=offsets[1:])
+        controlPoints = numpy.concatenate([c[0] for c in converted]) if converted else numpy.empty((0, 2), dtype=numpy.int64)
+        return SliderTable.FromColumns(pending, (controlPoints, offsets, numpy.array([c[1] for c in converted], dtype=numpy.int64).reshape(-1),
+                                                 numpy.array([c[2] for c in converted], dtype=numpy.float64).reshape(-1)))
+    
+    # <summary>
+    # Makes the table of converted sliders from the sliders they were converted from and the columns made by converting them.
+    # </summary>
+    # <param name="pending">A list holding the <see cref="main.processSlider"/> arguments of every slider.</param>
+    # <param name="converted">A tuple (ControlPoints, Offsets, Length, BeatLength) of the converted sliders, in the order of pending, see <see cref="Columns"/>.</param>
+    @staticmethod
+    def FromColumns(pending, converted):
+        # (bpm, gsv, xpos, ypos, time, objtype, hitSound, sliderType, poslist, slides, length, rest)
+        columns = [numpy.array([p[i] for p in pending], dtype=numpy.int64).reshape(-1) for i in (2, 3, 4, 5, 6, 9)]
+        controlPoints, offsets, length, beatLength = converted
+        return SliderTable(*columns, length, beatLength, [p[11] for p in pending], controlPoints, offsets)
+
+    # <summary>
+    # Puts tables one after the other into one table.
+    # </summary>
+    # <param name="tables">A list of <see cref="SliderTable"/>s.</param>
+    @staticmethod
+    def Concatenate(tables):
+        if (len(tables) == 1):
+            return tables[0]
+        if (len(tables) == 0):
+            return SliderTable.FromConverted([], [])
+
+        offsets = [numpy.zeros(1, dtype=numpy.int64)]
+        for table in tables:
+            offsets.append(table.Offsets[1:]+offsets[-1][-1])
+        columns = [numpy.concatenate([getattr(table, column) for table in tables]) for column in ('X', 'Y', 'Time', 'ObjectType', 'HitSound', 'Slides', 'Length', 'BeatLength')]
+        return SliderTable(*columns, [rest for table in tables for rest in table.Rest],
+                           numpy.concatenate([table.ControlPoints for table in tables]), numpy.concatenate(offsets))
+
+    # <summary>
+    # The control points following the head of a slider.
+    # </summary>
+    # <param name="i">The index of the slider.</param>
+    def Points(self, i):
+        return self.ControlPoints[self.Offsets[i]:self.Offsets[i+1]]
+
+    # <summary>
+    # What <see cref="main.processSlider"/> returned for a slider.
+    # </summary>
+    # <param name="i">The index of the slider.</param>
+    # <returns>A tuple (control points, length, beat length).</returns>
+    def Converted(self, i):
+        return self.Points(i), int(self.Length[i]), float(self.BeatLength[i])
+
+    # <summary>
+    # The columns made by converting some consecutive sliders, which together with the sliders they were converted from
+    # make their table again, see <see cref="FromColumns"/>.
+    # </summary>
+    # <param name="start">The index of the first slider.</param>
+    # <param name="stop">The index after the last slider.</param>
+    # <returns>A tuple (ControlPoints, Offsets, Length, BeatLength) holding only those sliders, with Offsets starting at 0.</returns>
+    def Columns(self, start, stop):
+        offsets = self.Offsets[start:stop+1]
+        return self.ControlPoints[offsets[0]:offsets[-1]], offsets-offsets[0], self.Length[start:stop], self.BeatLength[start:stop]
+    
+    # <summary>
+    # Makes the HitObject line of a converted slider. The slider is moved back one ms so that timing for the rest of the song
+    # doesn't get offset by +1ms.
+    # </summary>
+    # <param name="i">The index of the slider.</param>
+    def Line(self, i):
+        return HitObjectSerializer.SerializeSlider(self.X[i], self.Y[i], self.Time[i]-1, self.ObjectType[i], self.HitSound[i], self.Points(i),
+                                                   self.Slides[i], self.Length[i], self.Rest[i])
+
+    # <summary>
+    # Finds the sliders that need timing points of their own, which are all of them unless their beat length is 0.
+    # </summary>
+    # <returns>An int64 array holding the indices of those sliders sorted by time, sliders at the same time in table order.</returns>
+    def TimingOrder(self):
+        timed = numpy.flatnonzero(self.BeatLength != 0)
+        return timed[numpy.argsort(self.Time[timed], kind='stable')]
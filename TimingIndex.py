@@ -0,0 +1,75 @@
+import bisect
+import numpy
+import src.Profiler as Profiler
+
+
+class TimingIndex:
+
+    # <summary>
+    # Times: The times of all timing points, sorted, as an int64 array.
+    # BeatLengths: The beat length of the uninherited timing point in effect at each timing point.
+    # SvMultipliers: The slider velocity multiplier set by each timing point (1 for uninherited timing points).
+    # ScaledBpms: The bpm times the sv multiplier at each timing point, or what the bpm would have to be if the sv multiplier were 1 at that point.
+    # </summary>
+    __slots__ = ('Times', 'BeatLengths', 'SvMultipliers', 'ScaledBpms', 'timeList')
+
+    # <summary>
+    # Creates a new <see cref="TimingIndex"/> from the timing points of a beatmap.
+    # </summary>
+    # <param name="timingPoints">The <see cref="BeatmapParser.TimingPoint"/>s of the beatmap, in file order.</param>
+    @Profiler.Profiled
+    def __init__(self, timingPoints):
+        times = []
+        beatLengths = []
+        svMultipliers = []
+        scaledBpms = []
+
+        curbeatlength = 0
+        curbpm = 0
+        for timingPoint in timingPoints:
+            times.append(timingPoint.Time)
+            if timingPoint.Uninherited:
+                curbeatlength = float(timingPoint.BeatLength)
+                curbpm = float(60000/curbeatlength)
+                svMultipliers.append(1.0)
+                scaledBpms.append(curbpm)
+            else:
+                svMultipliers.append(-100/float(timingPoint.BeatLength))
+                scaledBpms.append(float(-100*curbpm/float(timingPoint.BeatLength)))
+            beatLengths.append(curbeatlength)
+
+        # A stable sort keeps timing points sharing a time in file order, so that the last one takes effect.
+        order = numpy.argsort(numpy.array(times, dtype=numpy.int64), kind='stable')
+        self.Times = numpy.array(times, dtype=numpy.int64)[order]
+        self.BeatLengths = numpy.array(beatLengths, dtype=numpy.float64)[order]
+        self.SvMultipliers = numpy.array(svMultipliers, dtype=numpy.float64)[order]
+        self.ScaledBpms = numpy.array(scaledBpms, dtype=numpy.float64)[order]
+        self.timeList = self.Times.tolist()
+
+    def __len__(self):
+        return len(self.timeList)
+
+    # <summary>
+    # Finds the timing point in effect at a given time: the last one at or before it.
+    # Times before the first timing point use the first timing point, like osu! does.
+    # </summary>
+    # <param name="time">The time to look up.</param>
+    # <returns>The index of the timing point in the sorted arrays.</returns>
+    def IndexAt(self, time):
+        return max((bisect.bisect_right(self.timeList, time)-1, 0))
+
+    # <summary>
+    # Finds the timing points in effect at many times at once.
+    # </summary>
+    # <param name="times">An array of times to look up.</param>
+    # <returns>An int64 array holding the index of the timing point in effect at each time.</returns>
+    @Profiler.Profiled
+    def Lookup(self, times):
+        return numpy.maximum(numpy.searchsorted(self.Times, times, side='right')-1, 0)
+
+    # <summary>
+    # The bpm times the sv multiplier in effect at a given time.
+    # </summary>
+    # <param name="time">The time to look up.</param>
+    def ScaledBpmAt(self, time):
+        return float(self.ScaledBpms[self.IndexAt(time)])
@@ -0,0 +1,580 @@
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import src.BeatmapParser as BeatmapParser
+
+# The maps the suite converts: (name, timing points per slider, <see cref="syntheticBeatmap"/> options).
+# The first four hold a single kind of slider each and are also used for the slider microbenchmarks.
+SUITE_MAPS = (
+    ("linear", 0.25, {"sliderTypes": "L"}),
+    ("perfect", 0.25, {"sliderTypes": "P"}),
+    ("bezier", 0.25, {"sliderTypes": "B"}),
+    ("bezier_anchors", 0.25, {"sliderTypes": "B", "segments": 3}),
+    ("long_sliders", 0.25, {"sliderTypes": "LPB", "segments": 2, "durations": (2000, 6000), "mapLength": 3600000}),
+    ("sv_changes", 8, {"sliderTypes": "LPB", "mapLength": 180000}),
+)
+
+# The longest importing the converter may take in the startup benchmark, in ms, and the modules it must not load
+MAX_IMPORT_MS = 100
+HEAVY_MODULES = ("numpy", "sympy")
+
+# <summary>
+# Creates the text of a synthetic .osu file with evenly spread timing points and sliders.
+# Every eighth timing point is uninherited at 120 bpm; the others change the slider velocity.
+# </summary>
+# <param name="sliderCount">The amount of sliders in the [HitObjects] section.</param>
+# <param name="timingPointCount">The amount of timing points in the [TimingPoints] section.</param>
+# <param name="seed">The seed of the random generator, so that the same map is generated each time.</param>
+# <param name="sliderTypes">The slider types to choose from at random: "L" (linear), "P" (perfect circle) or "B" (bezier).</param>
+# <param name="segments">The amount of segments of bezier sliders, joined by red anchors (repeated control points).</param>
+# <param name="lengths">The range slider lengths are chosen from, in osu!pixels.</param>
+# <param name="durations">The range slider durations are chosen from, in milliseconds, or None to choose lengths instead.
+# The length of each slider is then made to last that long at the slider velocity in effect.</param>
+# <param name="mapLength">The time between the first and last slider, in milliseconds, or None for 500 ms between sliders.</param>
+# <returns>The contents of the .osu file.</returns>
+
+def syntheticBeatmap(sliderCount, timingPointCount, seed=0, sliderTypes="B", segments=1, lengths=(40, 200), durations=None, mapLength=None):
+    import bisect
+
+    rng = random.Random(seed)
+    lines = ["osu file format v14\n", "\n",
+             "[General]\n", "AudioFilename: audio.mp3\n", "\n",
+             "[Metadata]\n", "Title:Synthetic\n", "Version:Marathon\n", "\n",
+             "[Difficulty]\n", "SliderMultiplier:1.4\n", "SliderTickRate:1\n", "\n",
+             "[TimingPoints]\n"]
+
+    spacing = 500 if mapLength == None else max((1, mapLength//max((sliderCount, 1))))
+    end = 1000+spacing*sliderCount
+    # The time and sv multiplier of every timing point
+    svTimes = []
+    svs = []
+    for i in range(0, timingPointCount):
+        t = 1000+i*(end-1000)//timingPointCount
+        if i%8 == 0:
+            lines.append("%d,500,4,2,0,60,1,0\n" % t)
+            svs.append(1.0)
+        else:
+            beatLength = rng.choice(("-100", "-80", "-133.333333333333", "-50"))
+            lines.append("%d,%s,4,2,1,70,0,0\n" % (t, beatLength))
+            svs.append(-100/float(beatLength))
+        svTimes.append(t)
+    lines += ["\n", "\n", "[HitObjects]\n"]
+
+    for i in range(0, sliderCount):
+        sliderTime = 1000+i*spacing
+        x = rng.randint(0, 512)
+        y = rng.randint(0, 384)
+        sliderType = sliderTypes if len(sliderTypes) == 1 else rng.choice(sliderTypes)
+        if sliderType == "P":
+            points = [tuple(int(round(c)) for c in point) for point in arcControlPoints(rng, x, y)[1:]]
+        else:
+            points = []
+            for segment in range(0, segments if sliderType == "B" else 1):
+                if segment > 0:
+                    points.append(points[-1])
+                points += [(rng.randint(0, 512), rng.randint(0, 384)) for _ in range(rng.randint(1, 4))]
+
+        if durations == None:
+            length = rng.randint(*lengths)
+        else:
+            # At 120 bpm and a slider multiplier of 1.4 a slider travels 0.28 osu!pixels every millisecond at sv 1
+            sv = svs[max((bisect.bisect_right(svTimes, sliderTime)-1, 0))] if svs else 1.0
+            length = round(rng.randint(*durations)*0.28*sv)
+        lines.append("%d,%d,%d,2,0,%s|%s,1,%d,0|0,0:0|0:0,0:0:0:0:\n" % (x, y, sliderTime, sliderType, "|".join("%d:%d" % point for point in points), length))
+
+    return "".join(lines)
+
+# <summary>
+# Chooses the three control points of a circular arc slider: the start, a point on the arc and the end.
+# The point on the arc lies between the two others, like in the arcs mappers draw, so the arc is less than a full circle.
+# </summary>
+# <param name="rng">The random generator.</param>
+# <param name="x">The x position of the start.</param>
+# <param name="y">The y position of the start.</param>
+# <returns>A list of three float64 vectors.</returns>
+
+def arcControlPoints(rng, x, y):
+    import numpy
+
+    start = numpy.array((x, y), dtype=numpy.float64)
+    end = numpy.array((rng.randint(0, 512), rng.randint(0, 384)), dtype=numpy.float64)
+    offset = end-start
+    middle = (start+end)/2+numpy.array((-offset[1], offset[0]))*rng.uniform(-0.5, 0.5)
+    return [start, numpy.rint(middle), end]
+
+# <summary>
+# Extracts the global sv multiplier, bpm*sv points and sliders the way main() did before
+# <see cref="BeatmapParser.ParseBeatmap"/>: one full regex scan of the file per piece of information.
+# </summary>
+# <param name="lines">The lines of the file.</param>
+# <returns>The amount of timing points and sliders found.</returns>
+
+def legacyScan(lines):
+    gsv = -1
+    for line in lines:
+        match = re.search(r"SliderMultiplier:(\d+(\.\d+)?)", line)
+        if match:
+            gsv = float(match.group(1))
+
+    insideTPts = False
+    bpmpts = []
+    curbpm = 0
+    for line in lines:
+        if line == "[TimingPoints]\n":
+            insideTPts = True
+        if insideTPts and line == "\n":
+            insideTPts = False
+        match = re.search(r"^(\d+),(\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),1,", line)
+        if match and insideTPts:
+            curbpm = float(60000/float(match.group(2)))
+            bpmpts.append((int(match.group(1)), curbpm))
+        match = re.search(r"^(\d+),(-?\d+(\.\d+)?(E(\+|-)\d+)?),\d+,\d+,\d+,\d+,0", line)
+        if match and insideTPts:
+            bpmpts.append((int(match.group(1)), float(-100*curbpm/float(match.group(2)))))
+
+    sliders = []
+    for line in lines:
+        match = re.search(r"^(-?\d+),(-?\d+),(\d+),(\d+),(\d+),(B|P|L)(\|(-?\d+:-?\d+))*,1,(\d+(\.\d+)?)", line)
+        if match:
+            rest = re.sub(r"^(-?\d+),(-?\d+),(\d+),(\d+),(\d+),(B|P|L)", "", line)
+            positions = re.findall(r"\|(-?\d+:-?\d+)", rest[0:rest.find(",")])
+            rest = re.sub(r"^(\|-?\d+:-?\d+)*,", "", rest)
+            match = re.search(r"^(\d+),(\d+(\.\d+)?)", rest)
+            rest = re.sub(r"^(\d+),(\d+(\.\d+)?)", "", rest)
+            sliders.append([re.search(r"(-?\d+):(-?\d+)", entry).groups() for entry in positions])
+
+    # The output pass matched every line against the timing point, slider and version patterns once more.
+    for line in lines:
+        re.search(r"^(\d+),(\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),1,", line)
+        re.search(r"^(\d+),(-?\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),0,", line)
+        re.search(r"^(-?\d+),(-?\d+),(\d+),(\d+),(\d+),(B|P|L)(\|(-?\d+:-?\d+))*,(\d+),(\d+(\.\d+)?)", line)
+        re.search(r"^Version:(.*)$", line)
+
+    return len(bpmpts), len(sliders)
+
+# <summary>
+# Times parsing a synthetic marathon map with the legacy scans and with <see cref="BeatmapParser.ParseBeatmap"/>.
+# </summary>
+# <param name="sliderCounts">The map sizes to measure, in sliders.</param>
+# <param name="repeat">How many times each measurement is repeated; the fastest run is reported.</param>
+# <returns>A list of dicts holding the measurements for each map size.</returns>
+
+def benchmarkParse(sliderCounts=(1000, 5000, 20000), repeat=3):
+    results = []
+    for sliderCount in sliderCounts:
+        text = syntheticBeatmap(sliderCount, sliderCount//4)
+        lines = text.splitlines(keepends=True)
+
+        legacy = min(timed(legacyScan, lines) for _ in range(repeat))
+        streaming = min(timed(lambda l: sum(1 for _ in BeatmapParser.ParseBeatmap(l)), lines) for _ in range(repeat))
+        results.append({"sliders": sliderCount, "bytes": len(text), "legacy_s": legacy, "parser_s": streaming, "speedup": legacy/streaming})
+    return results
+
+# <summary>
+# Times converting the sliders of a synthetic map with different amounts of worker processes,
+# checking that every amount of workers gives the same sliders.
+# </summary>
+# <param name="sliderCount">The amount of sliders in the map.</param>
+# <param name="workerCounts">The amounts of workers to measure.</param>
+# <returns>A list of dicts holding the measurements for each amount of workers.</returns>
+
+def benchmarkSliderJobs(sliderCount=5000, workerCounts=(1, 2, 4)):
+    import src.main as converter
+
+    records, gsv, timing, pending = converter.readBeatmap(syntheticBeatmap(sliderCount, sliderCount//4).splitlines(keepends=True))
+
+    results = []
+    reference = None
+    for workers in workerCounts:
+        start = time.perf_counter()
+        sliders = converter.processSliders(pending, workers)
+        elapsed = time.perf_counter()-start
+
+        if reference == None:
+            reference = (sliders, elapsed)
+        elif not sameSliders(sliders, reference[0]):
+            raise AssertionError("Converting with %d workers gave different sliders than with %d" % (workers, workerCounts[0]))
+        results.append({"sliders": sliderCount, "workers": workers, "seconds": elapsed, "speedup": reference[1]/elapsed})
+    return results
+
+# <summary>
+# Builds the control points of an invisible slider one tuple at a time, the way processSlider did before
+# <see cref="main.controlPointStream"/>.
+# </summary>
+# <returns>A tuple (control points, length) where the control points are a list of tuples.</returns>
+
+def legacyControlPoints(xpos, ypos, xpoints, ypoints):
+    tlen = len(xpoints)
+    newposlist = []
+    framedist = 2*67141632+2*33587200+xpos+ypos-xpoints[0]-ypoints[0]
+    snaptol = 50000;
+    
+    newposlist.append((4196352+xpos, ypos))
+    newposlist.append((4196352+xpos, 2099200+ypos))
+    newposlist.append((8392704+xpos, 2099200+ypos))
+    newposlist.append((8392704+xpos, 4198400+ypos))
+    newposlist.append((16785408+xpos, 4198400+ypos))
+    newposlist.append((16785408+xpos, 8396800+ypos))
+    newposlist.append((33570816+xpos, 8396800+ypos))
+    newposlist.append((33570816+xpos, 16793600+ypos))
+    newposlist.append((67141632+xpos, 16793600+ypos))
+    newposlist.append((67141632+xpos, 33587200+ypos+snaptol))
+    newposlist.append((67141632+xpos, ypoints[0]))
+    newposlist.append((xpoints[0], ypoints[0]))
+    curlen = framedist+2*snaptol;
+    for t in range(1,tlen):
+        newposlist.append((67141632+xpos, ypoints[t-1]))
+        newposlist.append((67141632+xpos, round(33587200+0.5*(ypos-xpos+xpoints[t-1]+xpoints[t]+ypoints[t-1]+ypoints[t]-xpoints[0]-ypoints[0]))))
+        if ((ypos-xpos+xpoints[t-1]+xpoints[t]+ypoints[t-1]+ypoints[t]-xpoints[0]-ypoints[0]) % 2 == 1):
+            curlen = curlen+1
+        newposlist.append((67141632+xpos, ypoints[t]))
+        newposlist.append((xpoints[t], ypoints[t]))
+        curlen = curlen + framedist
+    
+    newposlist.append(newposlist[-1])
+    newposlist.append(newposlist[-1])
+    return newposlist, curlen
+
+# <summary>
+# Times building the control points of single sliders of different durations, one tuple at a time and with
+# <see cref="main.controlPointStream"/>, checking that both give the same control points and length.
+# </summary>
+# <param name="durations">The slider durations to measure, in milliseconds.</param>
+# <param name="repeat">How many times each measurement is repeated; the fastest run is reported.</param>
+# <returns>A list of dicts holding the measurements for each duration.</returns>
+
+def benchmarkControlPoints(durations=(1000, 10000, 60000), repeat=3):
+    import src.main as converter
+    import src.SliderPath as SliderPath
+
+    results = []
+    for duration in durations:
+        # At 120 bpm and a slider multiplier of 1.4 a slider travels 0.28 osu!pixels every millisecond
+        controlPoints = converter.sliderControlPoints(64, 48, "B", [(448, 48), (448, 336), (64, 336), (256, 192)])
+        xpoints, ypoints = SliderPath.SliderPath(controlPoints, duration*0.28).SamplePositions(duration)
+        xpoints, ypoints = xpoints[:duration], ypoints[:duration]
+        xlist, ylist = xpoints.tolist(), ypoints.tolist()
+
+        legacy = min(timed(legacyControlPoints, 64, 48, xlist, ylist) for _ in range(repeat))
+        vectorized = min(timed(converter.controlPointStream, 64, 48, xpoints, ypoints) for _ in range(repeat))
+
+        expected = legacyControlPoints(64, 48, xlist, ylist)
+        stream, curlen, framedist = converter.controlPointStream(64, 48, xpoints, ypoints)
+        if stream.tolist() != [list(point) for point in expected[0]] or curlen != expected[1]:
+            raise AssertionError("The control points of the %d ms slider differ" % (duration))
+        results.append({"duration_ms": duration, "points": len(stream), "legacy_s": legacy, "vectorized_s": vectorized, "speedup": legacy/vectorized})
+    return results
+
+# <summary>
+# Times turning the converted sliders of a synthetic map into HitObject lines, formatting every coordinate on its own
+# like the converter did before and with <see cref="HitObjectSerializer.SerializeSlider"/>, checking that the text is the same.
+# </summary>
+# <param name="sliderCount">The amount of sliders in the map.</param>
+# <param name="repeat">How many times each measurement is repeated; the fastest run is reported.</param>
+# <returns>A dict holding the amount of text made and the throughput of both ways in MB/s.</returns>
+
+def benchmarkSerializer(sliderCount=500, repeat=3):
+    import src.main as converter
+
+    records, gsv, timing, pending = converter.readBeatmap(syntheticBeatmap(sliderCount, sliderCount//4).splitlines(keepends=True))
+    sliders = converter.processSliders(pending)
+
+    def legacy():
+        return ["%d,%d,%d,%d,%d,L|%s,%d,%f%s" % (sliders.X[i], sliders.Y[i], sliders.Time[i]-1, sliders.ObjectType[i], sliders.HitSound[i],
+                                                 "|".join(":".join(str(y) for y in x) for x in sliders.Points(i).tolist()), sliders.Slides[i], sliders.Length[i], sliders.Rest[i]) for i in range(0, len(sliders))]
+    def bulk():
+        return [sliders.Line(i) for i in range(0, len(sliders))]
+
+    expected = legacy()
+    if bulk() != expected:
+        raise AssertionError("The serialized sliders differ")
+    megabytes = sum(len(line) for line in expected)/1e6
+    legacySeconds = min(timed(legacy) for _ in range(repeat))
+    bulkSeconds = min(timed(bulk) for _ in range(repeat))
+    return {"sliders": sliderCount, "megabytes": megabytes, "legacy_mb_s": megabytes/legacySeconds, "bulk_mb_s": megabytes/bulkSeconds, "speedup": legacySeconds/bulkSeconds}
+
+# <summary>
+# Times flattening the paths of many sliders that repeat a few shapes at random positions, like copied patterns do,
+# without and with a <see cref="PathCache"/>, checking that both give the same paths.
+# </summary>
+# <param name="sliderCount">The amount of sliders.</param>
+# <param name="shapeCount">The amount of different shapes they are made of.</param>
+# <param name="chunkSize">The amount of sliders flattened at once, like a chunk of <see cref="main.processSliders"/>.</param>
+# <returns>A dict holding both times and the hit rate of the cache.</returns>
+
+def benchmarkPathCache(sliderCount=5000, shapeCount=200, chunkSize=250):
+    import numpy
+    import src.main as converter
+    from src.PathCache import PathCache
+    from src.SliderPath import SliderPath
+
+    rng = random.Random(0)
+    shapes = []
+    for _ in range(0, shapeCount):
+        shapes.append([(rng.randint(-128, 128), rng.randint(-96, 96)) for _ in range(rng.randint(1, 4))])
+    controlPointSets = []
+    for _ in range(0, sliderCount):
+        x = rng.randint(128, 384)
+        y = rng.randint(96, 288)
+        controlPointSets.append(converter.sliderControlPoints(x, y, "B", [(x+dx, y+dy) for dx, dy in rng.choice(shapes)]))
+    lengths = [rng.randint(40, 200) for _ in range(0, sliderCount)]
+    chunks = range(0, sliderCount, chunkSize)
+
+    cache = PathCache()
+    def flatten(cache):
+        return [SliderPath.ComputeMany(controlPointSets[i:i+chunkSize], lengths[i:i+chunkSize], cache) for i in chunks]
+    expected = flatten(None)
+    if not all(numpy.array_equal(a, b) for x, y in zip(expected, flatten(cache)) for a, b in zip(x, y)):
+        raise AssertionError("The cached paths differ")
+    hitRate = cache.HitRate()
+
+    uncached = timed(flatten, None)
+    cached = timed(flatten, cache)
+    return {"sliders": sliderCount, "shapes": shapeCount, "uncached_s": uncached, "cached_s": cached, "speedup": uncached/cached, "hit_rate": hitRate}
+
+# <summary>
+# Measures how long importing the converter takes in a fresh interpreter, using python -X importtime,
+# and which heavy modules it loads on the way.
+# </summary>
+# <param name="module">The module to import.</param>
+# <param name="repeat">How many fresh interpreters to measure; the fastest one is reported.</param>
+# <param name="heavyModules">Modules that importing the converter should not load.</param>
+# <param name="prelude">Python statements run before the import, such as ones making the src package importable from elsewhere.
+# They are not part of the import time of the module.</param>
+# <returns>A dict holding the cumulative import time of the module in ms, the slowest modules it imports and the heavy modules it loaded.</returns>
+
+def benchmarkStartup(module="src.main", repeat=5, heavyModules=HEAVY_MODULES, prelude=""):
+    # The folder the src package is in
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    best = None
+    for _ in range(0, repeat):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", "%s\nimport %s" % (prelude, module)], cwd=root, capture_output=True, text=True, check=True)
+        times = {}
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+            if match:
+                times[match.group(4)] = int(match.group(2))
+        if best == None or times[module] < best[module]:
+            best = times
+
+    slowest = sorted(((name, microseconds/1000) for name, microseconds in best.items() if name != module), key=lambda entry: -entry[1])[:5]
+    return {"module": module, "import_ms": best[module]/1000, "slowest": slowest, "heavy": [name for name in heavyModules if name in best]}
+
+# <summary>
+# Measures the peak memory of converting synthetic maps of growing size in a fresh process, holding the whole map
+# in memory and streaming it, checking that both give the same file.
+# </summary>
+# <param name="sliderCounts">The map sizes to measure, in sliders.</param>
+# <returns>A list of dicts holding the size of the map and the peak resident memory of both ways in MB.</returns>
+
+def benchmarkMemory(sliderCounts=(500, 2000, 8000)):
+    import hashlib
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # ru_maxrss is in kilobytes on Linux. A child process starts from the peak of this process at the time it is
+    # started, so the converted files are only hashed here rather than read into memory.
+    script = "import resource, sys, src.main as converter; converter.convertFile(sys.argv[1], stream=sys.argv[2] == '1'); print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for sliderCount in sliderCounts:
+            file = os.path.join(directory, "synthetic %d [Marathon].osu" % (sliderCount))
+            with open(file, 'w', encoding="utf8") as FDW:
+                FDW.write(syntheticBeatmap(sliderCount, sliderCount//4))
+
+            peaks = []
+            outputs = []
+            for stream in ("0", "1"):
+                process = subprocess.run([sys.executable, "-c", script, file, stream], cwd=root, capture_output=True, text=True, check=True)
+                peaks.append(int(process.stdout.split()[-1])/1024)
+                digest = hashlib.sha256()
+                with open(file[:-5]+"-INVIS].osu", 'rb') as FD:
+                    for block in iter(lambda: FD.read(1 << 20), b""):
+                        digest.update(block)
+                outputs.append(digest.hexdigest())
+            if outputs[0] != outputs[1]:
+                raise AssertionError("Streaming the %d slider map gave a different file" % (sliderCount))
+            size = os.path.getsize(file[:-5]+"-INVIS].osu")
+            results.append({"sliders": sliderCount, "output_mb": size/1e6, "in_memory_mb": peaks[0], "streaming_mb": peaks[1]})
+    return results
+
+# <summary>
+# Times converting a synthetic map of every kind in <see cref="SUITE_MAPS"/> from text to text with <see cref="main.convertBeatmap"/>.
+# The path cache is emptied before every run, so that runs after the first do not reuse its paths.
+# </summary>
+# <param name="sliderCount">The amount of sliders of every map.</param>
+# <param name="repeat">How many times each measurement is repeated; the fastest run is reported.</param>
+# <returns>A list of dicts holding the name, size and conversion time of every map.</returns>
+
+def benchmarkConvert(sliderCount=500, repeat=3):
+    import src.main as converter
+
+    results = []
+    for name, timingPointsPerSlider, options in SUITE_MAPS:
+        text = syntheticBeatmap(sliderCount, int(sliderCount*timingPointsPerSlider), **options)
+        def convert():
+            converter.PATH_CACHE.Clear()
+            return converter.convertBeatmap(text)
+        output = convert()
+        seconds = min(timed(convert) for _ in range(repeat))
+        results.append({"name": "convert/%s" % (name), "sliders": sliderCount, "input_mb": len(text)/1e6, "output_mb": len(output)/1e6,
+                        "seconds": seconds, "sliders_per_s": sliderCount/seconds})
+    return results
+
+# <summary>
+# Times the steps of converting a slider on their own: approximating bezier curves and circular arcs,
+# building a <see cref="SliderPath"/> and <see cref="main.processSlider"/>, the latter two for the sliders of
+# each map of <see cref="SUITE_MAPS"/> holding a single kind of slider.
+# </summary>
+# <param name="count">The amount of curves, or sliders, every measurement goes through.</param>
+# <param name="repeat">How many times each measurement is repeated; the fastest run is reported.</param>
+# <returns>A list of dicts holding the name, amount of calls and time of every measurement.</returns>
+
+def benchmarkMicro(count=1000, repeat=3):
+    import numpy
+    import src.main as converter
+    import src.PathApproximator as PathApproximator
+    from src.SliderPath import SliderPath
+
+    results = []
+    def measure(name, function, calls):
+        seconds = min(timed(function) for _ in range(repeat))
+        results.append({"name": name, "calls": calls, "seconds": seconds, "us_per_call": 1e6*seconds/calls})
+
+    rng = random.Random(0)
+    curves = [numpy.array([(rng.randint(0, 512), rng.randint(0, 384)) for _ in range(rng.randint(3, 6))], dtype=numpy.float64) for _ in range(count)]
+    measure("ApproximateBezier", lambda: [PathApproximator.ApproximateBezier(curve) for curve in curves], count)
+    arcs = [arcControlPoints(rng, rng.randint(0, 512), rng.randint(0, 384)) for _ in range(count)]
+    measure("ApproximateCircularArc", lambda: [PathApproximator.ApproximateCircularArc(arc) for arc in arcs], count)
+
+    for name, timingPointsPerSlider, options in SUITE_MAPS[:4]:
+        records, gsv, timing, pending = converter.readBeatmap(syntheticBeatmap(count, int(count*timingPointsPerSlider), **options).splitlines(keepends=True))
+        controlPointSets = [converter.sliderControlPoints(p[2], p[3], p[7], p[8]) for p in pending]
+        measure("SliderPath/%s" % (name), lambda: [SliderPath(c, p[10]) for c, p in zip(controlPointSets, pending)], len(pending))
+        def process():
+            converter.PATH_CACHE.Clear()
+            return [converter.processSlider(*p) for p in pending]
+        measure("processSlider/%s" % (name), process, len(pending))
+    return results
+
+# <summary>
+# Describes what the benchmarks ran on, so that results measured on different machines or versions are not mistaken for each other.
+# </summary>
+# <returns>A dict holding the versions of python and numpy, the platform, the amount of CPUs and the git commit, if any.</returns>
+
+def environment():
+    import platform
+    import numpy
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "numpy": numpy.__version__, "platform": platform.platform(), "cpus": os.cpu_count(), "commit": commit}
+
+# <summary>
+# Prints how the named results of a run compare to those of an earlier run written with --output.
+# </summary>
+# <param name="results">The results of this run.</param>
+# <param name="path">The JSON file of the earlier run.</param>
+
+def compareResults(results, path):
+    import json
+
+    with open(path, 'r', encoding="utf8") as FD:
+        baseline = dict((result["name"], result) for result in json.load(FD)["results"] if "name" in result)
+    for result in results:
+        before = baseline.get(result["name"])
+        # Only measurements of the same amount of work are compared
+        if before != None and before.get("sliders") == result.get("sliders") and before.get("calls") == result.get("calls"):
+            print("%-30s %9.4fs -> %9.4fs, %.2fx" % (result["name"], before["seconds"], result["seconds"], before["seconds"]/result["seconds"]))
+
+# <summary>
+# Tells whether two <see cref="SliderTable"/>s of converted sliders are the same, comparing their columns by value.
+# </summary>
+
+def sameSliders(a, b):
+    import numpy
+
+    columns = ('X', 'Y', 'Time', 'ObjectType', 'HitSound', 'Slides', 'Length', 'BeatLength', 'ControlPoints', 'Offsets')
+    return a.Rest == b.Rest and all(numpy.array_equal(getattr(a, column), getattr(b, column)) for column in columns)
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter()-start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the invisible slider converter.")
+    parser.add_argument("benchmark", choices=["parse", "sliders", "controlpoints", "serialize", "pathcache", "startup", "memory", "convert", "micro", "suite"], help="The benchmark to run. suite runs convert and micro.")
+    parser.add_argument("--max-import-ms", type=float, default=MAX_IMPORT_MS, help="For startup: fail if importing the converter takes longer than this (default: %g)." % (MAX_IMPORT_MS))
+    parser.add_argument("--sliders", type=int, default=500, help="For convert, micro and suite: the amount of sliders of every map (default: 500).")
+    parser.add_argument("--repeat", type=int, default=3, help="For convert, micro and suite: how many times every measurement is repeated, keeping the fastest (default: 3).")
+    parser.add_argument("--output", metavar="FILE", help="Also write the results as JSON to FILE, with the environment they were measured in.")
+    parser.add_argument("--baseline", metavar="FILE", help="For convert, micro and suite: compare the results to those an earlier run wrote with --output.")
+    args = parser.parse_args()
+
+    status = 0
+    if args.benchmark == "parse":
+        results = benchmarkParse()
+        for result in results:
+            print("%(sliders)6d sliders, %(bytes)9d bytes: legacy %(legacy_s).3fs, parser %(parser_s).3fs, %(speedup).1fx" % result)
+    elif args.benchmark == "sliders":
+        results = benchmarkSliderJobs()
+        for result in results:
+            print("%(sliders)6d sliders, %(workers)2d workers: %(seconds).3fs, %(speedup).2fx" % result)
+    elif args.benchmark == "controlpoints":
+        results = benchmarkControlPoints()
+        for result in results:
+            print("%(duration_ms)6d ms slider, %(points)7d points: legacy %(legacy_s).4fs, vectorized %(vectorized_s).4fs, %(speedup).1fx" % result)
+    elif args.benchmark == "serialize":
+        results = benchmarkSerializer()
+        print("%(sliders)6d sliders, %(megabytes).1f MB: legacy %(legacy_mb_s).1f MB/s, bulk %(bulk_mb_s).1f MB/s, %(speedup).1fx" % results)
+    elif args.benchmark == "pathcache":
+        results = benchmarkPathCache()
+        print("%(sliders)6d sliders of %(shapes)d shapes: uncached %(uncached_s).3fs, cached %(cached_s).3fs, %(speedup).1fx, first run hit rate %(hit_rate).2f" % results)
+    elif args.benchmark == "memory":
+        results = benchmarkMemory()
+        for result in results:
+            print("%(sliders)6d sliders, %(output_mb)7.1f MB written: peak RSS in memory %(in_memory_mb)7.1f MB, streaming %(streaming_mb)7.1f MB" % result)
+    elif args.benchmark == "startup":
+        results = benchmarkStartup()
+        print("import %s: %.1f ms" % (results["module"], results["import_ms"]))
+        for name, milliseconds in results["slowest"]:
+            print("  %-30s %.1f ms" % (name, milliseconds))
+        if results["heavy"]:
+            print("FAIL: importing %s loads %s" % (results["module"], ", ".join(results["heavy"])))
+            status = 1
+        elif results["import_ms"] > args.max_import_ms:
+            print("FAIL: importing %s takes more than %g ms" % (results["module"], args.max_import_ms))
+            status = 1
+    else:
+        results = []
+        if args.benchmark in ("convert", "suite"):
+            results += benchmarkConvert(args.sliders, args.repeat)
+        if args.benchmark in ("micro", "suite"):
+            results += benchmarkMicro(args.sliders, args.repeat)
+        for result in results:
+            if "sliders_per_s" in result:
+                print("%(name)-30s %(seconds)9.4fs, %(sliders_per_s)8.0f sliders/s, %(output_mb)7.1f MB written" % result)
+            else:
+                print("%(name)-30s %(seconds)9.4fs, %(us_per_call)9.1f us per call" % result)
+        if args.baseline != None:
+            print("Compared to %s:" % (args.baseline))
+            compareResults(results, args.baseline)
+
+    if args.output != None:
+        import json
+        with open(args.output, 'w', encoding="utf8") as FDW:
+            json.dump({"benchmark": args.benchmark, "environment": environment(), "results": results}, FDW, indent=1)
+    return status
+
+if __name__=="__main__": sys.exit(main())
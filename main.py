@@ -1,193 +1,935 @@
-import numpy
+import argparse
+import hashlib
 import os
 import re
-from src.PathControlPoint import PathControlPoint
-from src.SliderPath import SliderPath
-from sympy.functions.elementary.integers import ceiling
-
-def main():
-    
-    for file in os.listdir("."):
-        if file.endswith(".osu"):
-            FD = open(file, 'r', encoding="utf8")
-            FDW = open(file[:-5]+"-INVIS].osu", 'w', encoding="utf8")
-            lines = FD.readlines()
-            sliders = []
+import sys
+import time
+import src.BeatmapParser as BeatmapParser
+from src.ConversionCache import ConversionCache
+import src.HitObjectSerializer as HitObjectSerializer
+from src.PathCache import PathCache
+import src.Profiler as Profiler
+
+# numpy, and the modules doing path math with it, are imported by the functions that need them, and so is
+# the process pool. Showing the help, or skipping files found in the conversion cache, then never loads numpy,
+# and neither does a worker process before it gets its first file.
+
+SLIDER_MULTIPLIER = re.compile(r"\d+(\.\d+)?")
+
+# Part of the key of every cached conversion. Change it whenever the output of the converter changes.
+CONVERTER_VERSION = 1
+
+# The amount of sliderball positions whose sliders are converted at once when streaming; a longer slider is converted on its own
+STREAM_CHUNK_FRAMES = 1 << 18
+
+# The average amount of consecutive sliders of a map stored together as one entry of the "sliders" layer of the conversion
+# cache, see <see cref="cacheChunks"/>. No entry holds more than four times as many.
+CACHE_CHUNK_SLIDERS = 256
+
+# The flattened paths of the sliders converted by this process, so that repeated slider shapes are only flattened once
+PATH_CACHE = PathCache()
+
+# The multiples of osu!'s flattening tolerances the "auto" tolerance tries, coarsest first
+TOLERANCE_SCALES = (16, 8, 4, 2, 1.25)
+
+# How many times the "auto" tolerance flattens the paths with each tolerance, timing the fastest so that warming up does not count
+TOLERANCE_RUNS = 3
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Makes new .osu files out of the given ones where all sliders are invisible.")
+    parser.add_argument("paths", nargs="*", default=["."], metavar="PATH", help="The .osu or .osz files to convert, folders holding them or glob patterns matching either (default: the current folder). A .osz file is converted into a new .osz file holding its converted .osu files next to the original ones.")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also convert the .osu and .osz files in the subfolders of the given folders, such as every map of a Songs folder.")
+    parser.add_argument("--output", "-o", metavar="DIR", help="The folder to write the new files to, keeping their path relative to the folder or pattern they were found through (default: next to the originals).")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="The number of .osu files converted in parallel, 0 for one per CPU (default: 1).")
+    parser.add_argument("--slider-jobs", type=int, default=1, help="The number of processes converting the sliders of a single .osu file, 0 for one per CPU (default: 1). Useful for huge maps.")
+    parser.add_argument("--compact", action="store_true", help="Use fewer control points where the sliderball stands still or moves along an axis. The sliderball appears at the same positions.")
+    parser.add_argument("--verify", action="store_true", help="With --compact, check every slider against the standard encoding and fail the file if a sliderball position differs.")
+    parser.add_argument("--stream", action="store_true", help="Convert and write sliders a few at a time, so that memory use does not grow with the size of the map. Reads every file twice.")
+    parser.add_argument("--cache", metavar="DIR", help="A folder caching converted files and sliders between runs. Files whose output is current are skipped.")
+    parser.add_argument("--profile", metavar="FILE", default=os.environ.get("INVIS_PROFILE"), help="Write the time spent in every stage of the conversion and counts of what was converted, per file and in total, to FILE as JSON, - for the standard output (default: the INVIS_PROFILE environment variable, off if unset).")
+    parser.add_argument("--cache-size", type=int, default=1024, metavar="MB", help="The size the cache is kept under by removing the least recently used entries (default: 1024).")
+    parser.add_argument("--tolerance", type=toleranceArgument, metavar="BEZIER,ARC", help="The largest distance in osu!pixels the flattened bezier and circular arc segments of slider paths may be from the curves. Coarser tolerances convert faster but may put the sliderball elsewhere (default: 0.25,0.1 like osu!). auto converts with the default and reports, for every file, the coarsest tolerance that puts the sliderball at the same positions, which takes longer. Sliders reused from --cache are not tried.")
+    args = parser.parse_intermixed_args(argv)
+    if args.verify and not args.compact:
+        parser.error("--verify checks the compact encoding and needs --compact")
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    sliderJobs = args.slider_jobs if args.slider_jobs > 0 else os.cpu_count()
+    cache = ConversionCache(args.cache, args.cache_size*1024*1024) if args.cache else None
+    
+    files, missing = findBeatmaps(args.paths, args.recursive)
+    for path in missing:
+        print("No .osu or .osz file or folder matches %s" % (path), file=sys.stderr)
+    outputs = None if args.output == None else [outputPath(file, base, args.output) for file, base in files]
+    files = [file for file, base in files]
+    
+    failed = 0
+    cachecounts = [0, 0, 0, 0]
+    profiles = []
+    total = Profiler.Profiler()
+    start = time.perf_counter()
+    for file, result, error in convertFiles(files, outputs, jobs, sliderJobs, args.compact, args.verify, cache, args.stream, args.profile != None, args.tolerance):
+        if error != None:
+            failed = failed+1
+            print("Failed to convert %s: %s" % (file, error), file=sys.stderr)
+            profiles.append({"file": file, "error": error})
+            continue
+        if args.profile != None:
+            profiles.append(dict({"file": file, "output": result[0]}, **result[4]))
+        if result[4] != None:
+            total.Merge(result[4])
+        if args.compact and result[2] > 0:
+            print("%s: %d slider control points instead of %d (-%.1f%%)" % (file, result[1], result[2], 100*(result[2]-result[1])/result[2]))
+        if args.tolerance == "auto":
+            printTolerance(file, toleranceReport(result[4]["counts"]))
+        cachecounts = [a+b for a, b in zip(cachecounts, result[3])]
+    
+    if cache != None:
+        print("Cache: %d of %d files and %d of %d sliders reused" % (cachecounts[0], cachecounts[0]+cachecounts[1], cachecounts[2], cachecounts[2]+cachecounts[3]))
+    if failed:
+        print("%d of %d files failed to convert" % (failed, len(files)), file=sys.stderr)
+    if args.tolerance == "auto" and len(files) > 1:
+        printTolerance("All files", toleranceReport(total.Counts))
+    if args.profile != None:
+        writeProfile(args.profile, profiles, dict(total.Report(), files=len(files), failed=failed, seconds=time.perf_counter()-start))
+    return 1 if failed or missing else 0
+
+# <summary>
+# Converts many .osu and .osz files, each into a new file with all its sliders made invisible, see <see cref="convertFile"/>.
+# A file that fails to convert does not stop the others from being converted.
+# </summary>
+# <param name="files">The paths of the .osu files to convert.</param>
+# <param name="outputs">The paths of the new files, in the order of files, or None to use <see cref="outputName"/>.</param>
+# <param name="jobs">The number of files converted at the same time, each in its own process. 1 converts them one after another in this process.</param>
+# <param name="sliderJobs">The number of processes converting the sliders of each file, see <see cref="processSliders"/>.</param>
+# <param name="compact">Whether to use the compact slider encoding, see <see cref="processSlider"/>.</param>
+# <param name="verify">Whether to check the compact encoding of every slider, see <see cref="convertFile"/>.</param>
+# <param name="cache">The <see cref="ConversionCache"/> to reuse conversions from, or None.</param>
+# <param name="stream">Whether to convert the files with <see cref="streamFile"/>.</param>
+# <param name="profile">Whether to profile the conversion of every file, see <see cref="convertFile"/>.</param>
+# <param name="tolerance">The tolerances slider paths are flattened with, see <see cref="convertFile"/>.</param>
+# <returns>A list of (file, result, error) tuples in the order of files, where result is what <see cref="convertFile"/> returned
+# and error is None if the conversion succeeded (result is None otherwise).</returns>
+
+def convertFiles(files, outputs=None, jobs=1, sliderJobs=1, compact=False, verify=False, cache=None, stream=False, profile=False, tolerance=None):
+    if outputs == None:
+        outputs = [None]*len(files)
+    results = []
+    if jobs <= 1:
+        for file, output in zip(files, outputs):
+            try:
+                results.append((file, convertFile(file, output, sliderJobs, compact, verify, cache, stream, profile, tolerance), None))
+            except Exception as e:
+                results.append((file, None, "%s: %s" % (type(e).__name__, e)))
+        return results
+    
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(convertFile, file, output, sliderJobs, compact, verify, cache, stream, profile, tolerance) for file, output in zip(files, outputs)]
+        for file, future in zip(files, futures):
+            try:
+                results.append((file, future.result(), None))
+            except Exception as e:
+                results.append((file, None, "%s: %s" % (type(e).__name__, e)))
+    return results
+
+# <summary>
+# Converts a .osu file into a new file where all sliders are invisible, or a .osz archive into a new one that also
+# holds the converted version of every .osu file in it, see <see cref="convertArchive"/>.
+# </summary>
+# <param name="file">The path of the .osu or .osz file to convert.</param>
+# <param name="output">The path of the new file, see <see cref="outputName"/> for the default. Missing folders are created.</param>
+# <param name="sliderJobs">The number of processes converting the sliders of the file, see <see cref="processSliders"/>.</param>
+# <param name="compact">Whether to use the compact slider encoding, see <see cref="processSlider"/>.</param>
+# <param name="verify">Whether to also make the standard encoding of every slider and raise a ValueError if the compact
+# one puts the sliderball anywhere else, see <see cref="verifyCompactSlider"/>. Only used together with compact.</param>
+# <param name="cache">The <see cref="ConversionCache"/> to reuse conversions from, or None. If it holds the conversion of
+# the same file contents with the same options, including whether the compact encoding was verified, and the new file is
+# still the one written then, nothing is done.</param>
+# <param name="stream">Whether to convert the file with <see cref="streamFile"/>, which gives the same file using less memory.</param>
+# <param name="profile">Whether to time the stages of the conversion, see <see cref="Profiler.Profiling"/>.</param>
+# <param name="tolerance">The tolerances slider paths are flattened with: None for osu!'s, a tuple (bezier tolerance, circular arc tolerance)
+# in osu!pixels, or "auto" to use osu!'s and try coarser ones, see <see cref="tryTolerances"/>.</param>
+# <returns>A tuple (path, points, standardPoints, cachecounts, profile): the path of the new file, the amount of slider control points
+# written (over all .osu files of an archive), the amount the standard encoding uses for the same sliders, a tuple (file hits, file misses, slider hits,
+# slider misses) counting how the cache was used, and the <see cref="Profiler.Report"/> of the conversion if profile is set, or if the tolerance
+# is "auto" and nothing is being profiled yet (None otherwise).</returns>
+
+def convertFile(file, output=None, sliderJobs=1, compact=False, verify=False, cache=None, stream=False, profile=False, tolerance=None):
+    if profile or (tolerance == "auto" and Profiler.ACTIVE == None):
+        with Profiler.Profiling() as profiler:
+            start = time.perf_counter()
+            result = convertFile(file, output, sliderJobs, compact, verify, cache, stream, tolerance=tolerance)
+            if result[3][0] == 0:
+                profiler.Count("bytes_written", outputStat(result[0])[0])
+            report = dict(profiler.Report(), seconds=time.perf_counter()-start)
+        return result[:4]+(report,)
+    
+    if output == None:
+        output = outputName(file)
+    if os.path.abspath(output) == os.path.abspath(file):
+        raise ValueError("The new file would replace %s" % (file))
+    if cache != None:
+        with open(file, 'rb') as FD:
+            # A file converted without verifying is converted again to verify it
+            fileKey = ConversionCache.Key(CONVERTER_VERSION, compact, compact and verify, effectiveTolerance(tolerance), hashlib.sha256(FD.read()).hexdigest())
+        entry = cache.Get("files", fileKey)
+        if entry != None and outputStat(output) == entry[0]:
+            Profiler.Count("cached_files")
+            return entry[1]+((1, 0, 0, 0), None)
+    
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if file.endswith(".osz"):
+        points, standardPoints, sliderHits, sliderCount = convertArchive(file, output, sliderJobs, compact, verify, cache, stream, tolerance)
+    else:
+        with open(file, 'r', encoding="utf8") as FD, open(output, 'w', encoding="utf8", buffering=HitObjectSerializer.OUTPUT_BUFFER_SIZE) as FDW:
+            points, standardPoints, sliderHits, sliderCount = convertStream(FD, FDW, file, sliderJobs, compact, verify, cache, stream, tolerance)
+    
+    Profiler.Count("sliders", sliderCount)
+    Profiler.Count("control_points", points)
+    result = (output, points, standardPoints)
+    if cache == None:
+        return result+((0, 0, 0, 0), None)
+    Profiler.Count("cached_sliders", sliderHits)
+    cache.Put("files", fileKey, (outputStat(output), result))
+    return result+((0, 1, sliderHits, sliderCount-sliderHits), None)
+
+# <summary>
+# Converts the text of a .osu file into the text of a new one where all sliders are invisible, without using any file.
+# </summary>
+# <param name="text">The contents of the .osu file.</param>
+# <param name="sliderJobs">The number of processes converting the sliders, see <see cref="processSliders"/>.</param>
+# <param name="compact">Whether to use the compact slider encoding, see <see cref="processSlider"/>.</param>
+# <param name="verify">Whether to check the compact encoding of every slider, see <see cref="convertFile"/>.</param>
+# <param name="cache">The <see cref="ConversionCache"/> to reuse converted sliders from, or None.</param>
+# <param name="tolerance">The tolerances slider paths are flattened with, see <see cref="convertFile"/>. The tolerances "auto"
+# tries are counted in the active <see cref="Profiler"/>, if any.</param>
+# <returns>The contents of the new file.</returns>
+
+def convertBeatmap(text, sliderJobs=1, compact=False, verify=False, cache=None, tolerance=None):
+    import io
+    
+    FDW = io.StringIO()
+    # Reading the text like a file opened in text mode, which turns any line ending into "\n"
+    convertLines(io.StringIO(text, newline=None), FDW, "the beatmap", sliderJobs, compact, verify, cache, tolerance)
+    return FDW.getvalue()
+
+# <summary>
+# Converts every .osu and .osz file below a folder, keeping the folder structure.
+# </summary>
+# <param name="root">The folder to search for .osu files, see <see cref="findBeatmaps"/>.</param>
+# <param name="outRoot">The folder to write the new files to, at the same path relative to it as the originals have relative to root.
+# None writes them next to the originals.</param>
+# <param name="jobs">The number of files converted at the same time, see <see cref="convertFiles"/>.</param>
+# <returns>What <see cref="convertFiles"/> returned.</returns>
+
+def convertTree(root, outRoot=None, jobs=1, sliderJobs=1, compact=False, verify=False, cache=None, stream=False, profile=False, tolerance=None):
+    files, missing = findBeatmaps([root], recursive=True)
+    if missing:
+        raise FileNotFoundError("No such folder: %s" % (root))
+    outputs = None if outRoot == None else [outputPath(file, base, outRoot) for file, base in files]
+    return convertFiles([file for file, base in files], outputs, jobs, sliderJobs, compact, verify, cache, stream, profile, tolerance)
+
+# <summary>
+# Converts the .osu files in a .osz archive without extracting it. The new archive is a copy of the original one, with the
+# converted version of every .osu file appended next to it, so the audio and other assets are copied without being unpacked.
+# Every .osu file is read from the original archive and written into the new one as it is converted.
+# A .osu file whose converted version the archive already holds is not converted again.
+# </summary>
+# <param name="file">The path of the .osz archive.</param>
+# <param name="output">The path of the new archive. It is removed if any .osu file fails to convert.</param>
+# <returns>A tuple (points, standardPoints, hits, sliders) like <see cref="convertFile"/> needs, summed over the .osu files.</returns>
+
+@Profiler.Profiled
+def convertArchive(file, output, sliderJobs, compact, verify, cache, stream, tolerance):
+    import io
+    import shutil
+    import zipfile
+    
+    counts = [0, 0, 0, 0]
+    shutil.copyfile(file, output)
+    try:
+        with zipfile.ZipFile(file) as source, zipfile.ZipFile(output, 'a') as archive:
+            names = set(source.namelist())
+            for member in source.infolist():
+                name = member.filename
+                if not name.endswith(".osu") or name.endswith("-INVIS].osu") or outputName(name) in names:
+                    continue
+                
+                info = zipfile.ZipInfo(outputName(name), member.date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with io.TextIOWrapper(source.open(member), encoding="utf8") as FD, io.TextIOWrapper(archive.open(info, 'w'), encoding="utf8") as FDW:
+                    memberCounts = convertStream(FD, FDW, "%s in %s" % (name, file), sliderJobs, compact, verify, cache, stream, tolerance)
+                counts = [a+b for a, b in zip(counts, memberCounts)]
+    except BaseException:
+        os.remove(output)
+        raise
+    return counts
+
+# <summary>
+# Converts an open .osu file with <see cref="streamFile"/> or <see cref="convertLines"/>.
+# </summary>
+
+def convertStream(FD, FDW, name, sliderJobs, compact, verify, cache, stream, tolerance):
+    if stream:
+        return streamFile(FD, FDW, name, sliderJobs, compact, verify, cache, tolerance)
+    return convertLines(FD, FDW, name, sliderJobs, compact, verify, cache, tolerance)
+
+# <summary>
+# Converts the lines of a .osu file that is read all at once, writing the new file.
+# </summary>
+# <param name="lines">The lines of the file, such as an open text file.</param>
+# <param name="FDW">The file to write to.</param>
+# <param name="name">What to call the file in error messages.</param>
+# <returns>A tuple (points, standardPoints, hits, sliders) like <see cref="convertFile"/> needs.</returns>
+
+@Profiler.Profiled
+def convertLines(lines, FDW, name, sliderJobs, compact, verify, cache, tolerance):
+    records, gsv, timing, pending = readBeatmap(lines)
+    if (gsv == -1):
+        FDW.write("SliderMultiplier is NaN or not found in %s" % (name))
+        raise ValueError("SliderMultiplier is NaN or not found in %s" % (name))
+    
+    sliders, sliderHits = convertSliders(pending, sliderJobs, compact, verify, cache, tolerance)
+    
+    # The converted line of the first slider at each time replaces every slider line at that time
+    order = sliders.TimingOrder()
+    def sliderLine(i):
+        return sliders.Line(order[i])
+    
+    writeBeatmap(FDW, records, sliders.Time[order], sliders.BeatLength[order], sliderLine, timing)
+    points = len(sliders.ControlPoints)
+    standardPoints = sum(4*frameCount(p[0], p[1], p[10])+10 for p in pending)
+    return points, standardPoints, sliderHits, len(sliders)
+
+# <summary>
+# Converts the sliders of a file like <see cref="processSliders"/>, optionally through a cache and checking the compact encoding.
+# </summary>
+# <param name="pending">A list holding the <see cref="processSlider"/> arguments of every slider.</param>
+# <returns>A tuple (sliders, hits): the <see cref="SliderTable"/> of the converted sliders in the order of pending, and how many of them came from the cache.</returns>
+
+@Profiler.Profiled
+def convertSliders(pending, sliderJobs, compact, verify, cache, tolerance):
+    if cache != None:
+        sliders, sliderHits = cachedProcessSliders(pending, sliderJobs, compact, cache, tolerance)
+    else:
+        sliders, sliderHits = processSliders(pending, sliderJobs, compact=compact, tolerance=tolerance), 0
+    if compact and verify:
+        standard = processSliders(pending, sliderJobs, tolerance=effectiveTolerance(tolerance))
+        for i in range(0, len(sliders)):
+            if not verifyCompactSlider(int(sliders.X[i]), int(sliders.Y[i]), standard.Converted(i), sliders.Converted(i)):
+                raise ValueError("The compact encoding of the slider at %d ms moves the sliderball" % (sliders.Time[i]))
+    return sliders, sliderHits
+
+# <summary>
+# Writes the new .osu file: every line of the original one, with the generated timing points merged into the
+# [TimingPoints] section and the slider lines replaced by their converted version.
+# The generated timing points are merged in one pass over the time-sorted sliders,
+# which assumes the timing points are in time order like osu! writes them.
+# </summary>
+# <param name="FDW">The file to write to.</param>
+# <param name="records">The parsed records of every line of the original file, in file order, such as a <see cref="BeatmapParser.ParseBeatmap"/> generator.</param>
+# <param name="times">An int64 array holding the time of every converted slider that needs timing points, sorted.</param>
+# <param name="beatLengths">A float64 array holding the beat length of the timing point every one of those sliders needs, in the order of times.</param>
+# <param name="sliderLine">A function returning the converted line of the sliders at times[i], given the first such i.</param>
+# <param name="timing">The <see cref="TimingIndex"/> of the map.</param>
+
+@Profiler.Profiled
+def writeBeatmap(FDW, records, times, beatLengths, sliderLine, timing):
+    import bisect
+    
+    nextslider = 0
+    # Looked up one time at a time, which bisect does faster on a list
+    timeList = times.tolist()
+    beatLengthList = beatLengths.tolist()
+    def sliderAt(time):
+        i = bisect.bisect_left(timeList, time)
+        return i if i < len(timeList) and timeList[i] == time else -1
+    
+    prevtimingpoint = None
+    for record in records:
+        # Sliders before the first timing point are timed by it, like osu! does, so it also stands in for the timing point before them.
+        # Its time is below every slider's so that none of them is taken as having overridden it.
+        if prevtimingpoint == None and isinstance(record, BeatmapParser.TimingPoint):
+            prevtimingpoint = (float("-inf"), -100 if record.Uninherited else float(record.BeatLength), record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest)
+        
+        if isinstance(record, BeatmapParser.SectionEnd) and record.Section == "TimingPoints":
+            # Make the timing points of all sliders that occur after the last processed timing point (there are none without timing points)
+            if prevtimingpoint != None:
+                nextslider = writeSliderTimingPoints(FDW, timeList, beatLengthList, nextslider, None, prevtimingpoint, timing)
+            FDW.write("\n")
+        
+        # Uninherited timing point
+        elif isinstance(record, BeatmapParser.TimingPoint) and record.Uninherited:
+            # Make the timing points of all sliders that occur before the currently processing timing point and after the previously processed timing point
+            nextslider = writeSliderTimingPoints(FDW, timeList, beatLengthList, nextslider, record.Time, prevtimingpoint, timing)
             
-            # Finding global sv multiplier
-            gsv = -1
-            for line in lines:
-                match = re.search(r"SliderMultiplier:(\d+(\.\d+)?)", line)
-                if match:
-                    gsv = float(match.group(1))
-                    if (gsv < 0.4):
-                        gsv = 0.4
-                    if (gsv > 3.6):
-                        gsv = 3.6
-            if (gsv == -1):
-                FDW.write("SliderMultiplier is NaN or not found in %s" % (file))
-                exit()
+            # Override uninherited timing point if it occurs at the same time as the sliders' timing points
+            i = sliderAt(record.Time)
+            if i >= 0:
+                s = (timeList[i], beatLengthList[i])
+                # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
+                FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[0]-1, s[1], record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+                FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[0]-1, record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+                FDW.write("%d,%s,%s,%s,%s,%s,1,%s" % (s[0], record.BeatLength, record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+            else:
+                FDW.write(record.Line)
             
-            # Making a list of bpm*sv points
-            insideTPts = False
-            bpmpts = []
-            curbpm = 0
-            for line in lines:
-                if line == "[TimingPoints]\n":
-                    insideTPts = True
-                if insideTPts and line == "\n":
-                    insideTPts = False
-                
-                match = re.search(r"^(\d+),(\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),1,", line)
-                if match and insideTPts:
-                    curbpm = float(60000/float(match.group(2)))
-                    bpmpts.append((int(match.group(1)), curbpm))
-                
-                match = re.search(r"^(\d+),(-?\d+(\.\d+)?(E(\+|-)\d+)?),\d+,\d+,\d+,\d+,0", line)
-                if match and insideTPts:
-                    bpmpts.append((int(match.group(1)), float(-100*curbpm/float(match.group(2)))))
-                    
-            # Searching for sliders with no reverses (slides=1)
-            for line in lines:
-                match = re.search(r"^(-?\d+),(-?\d+),(\d+),(\d+),(\d+),(B|P|L)(\|(-?\d+:-?\d+))*,1,(\d+(\.\d+)?)", line)
-                if match:
-                    xpos = int(match.group(1))
-                    ypos = int(match.group(2))
-                    time = int(match.group(3))
-                    objtype = int(match.group(4))
-                    hitSound = int(match.group(5))
-                    sliderType = match.group(6)
-                    rest = re.sub(r"^(-?\d+),(-?\d+),(\d+),(\d+),(\d+),(B|P|L)", "", line)
-                    positionsstring = rest[0:rest.find(",")]
-                    positions = re.findall(r"\|(-?\d+:-?\d+)", positionsstring)                    
-                    rest = re.sub(r"^(\|-?\d+:-?\d+)*,", "", rest)
-                    match = re.search(r"^(\d+),(\d+(\.\d+)?)", rest)
-                    slides = int(match.group(1))
-                    length = float(match.group(2))
-                    rest = re.sub(r"^(\d+),(\d+(\.\d+)?)", "", rest)
-                    
-                    poslist = []
-                    for entry in positions:
-                        match2 = re.search(r"(-?\d+):(-?\d+)", entry)
-                        pos = (int(match2.group(1)), int(match2.group(2)))
-                        poslist.append(pos)
-                    
-                    # If a slider is already distorted somehow, we should not modify it.
-                    if not distorted(poslist):
-                        # The value passed to bpm isn't actually just the bpm - it's the bpm times the current sv multiplier, or what the bpm would have to be if the sv multiplier were 1  at that point.
-                        # The way I'm getting this is very ugly but it does work
-                        sliders.append(processSlider(bpmpts[numpy.where(numpy.array(bpmpts)[:,0] <= time)[0][-1]][1], gsv, xpos, ypos, time, objtype, hitSound, sliderType, poslist, slides, length, rest))
-                        
-                        
+            # prevtimingpoint = (time, inherited timing point beatLength, meter, sampleSet, sampleIndex, volume, effects)
+            # Inherited timing point beatLength is -100 because it is treated as the default (which is -100) until an inherited timing point sets it.
+            prevtimingpoint = (record.Time, -100, record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest)
+        
+        # Inherited timing point
+        elif isinstance(record, BeatmapParser.TimingPoint):
+            # Make the timing points of all sliders that occur before the currently processing timing point and after the previously processed timing point
+            nextslider = writeSliderTimingPoints(FDW, timeList, beatLengthList, nextslider, record.Time, prevtimingpoint, timing)
             
-            # Making new .osu file
-            insideTPts = False
-            unchangedline = True
-            prevtimingpoint = (-1, -1, -1, -1, -1, -1, -1)
-            for line in lines:
-                unchangedline = True
-                if line == "[TimingPoints]\n":
-                    insideTPts = True
-                if insideTPts and line == "\n":
-                    insideTPts = False
-                    
-                    unchangedline = False
-                    # Collect all sliders that occur after the last processed timing point, and make their timing points
-                    matchingsliders = [s for s in sliders if s[9] != 0 and s[2] > prevtimingpoint[0]]
-                    rest = re.sub(r"^(\d+),(\d+(\.\d+)?),(\d+),(\d+),(\d+),(\d+),1,", "", line)
-                    if matchingsliders:
-                        for s in matchingsliders:
-                            # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2]-1, s[9], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[2]-1, prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2], 60000/(bpmpts[numpy.where(numpy.array(bpmpts)[:,0] == prevtimingpoint[0])[0][-1]][1]*prevtimingpoint[1]/-100), prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,0,%s" % (s[2], prevtimingpoint[1], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                    FDW.write("\n")
-                
-                # Uninherited timing point matching
-                match = re.search(r"^(\d+),(\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),1,", line)
-                if match and insideTPts:
-                    unchangedline = False
-                    # Collect all sliders that occur before the currently processing timing point and after the previously processed timing point, and make their timing points
-                    matchingsliders = [s for s in sliders if (s[9] != 0 and (s[2] > prevtimingpoint[0] and s[2] < int(match.group(1))))]
-                    rest = re.sub(r"^(\d+),(\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),1,", "", line)
-                    if matchingsliders:
-                        for s in matchingsliders:
-                            # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2]-1, s[9], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[2]-1, prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2], 60000/(bpmpts[numpy.where(numpy.array(bpmpts)[:,0] == prevtimingpoint[0])[0][-1]][1]*prevtimingpoint[1]/-100), prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,0,%s" % (s[2], prevtimingpoint[1], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                    
-                    # Override uninherited timing point if it occurs at the same time as the sliders' timing points
-                    matchingsliders = [s for s in sliders if (s[9] != 0 and s[2] == int(match.group(1)))]
-                    if matchingsliders:
-                        s = matchingsliders[0]
-                        # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
-                        FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2]-1, s[9], match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                        FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[2]-1, match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                        FDW.write("%d,%s,%s,%s,%s,%s,1,%s" % (s[2], match.group(2), match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                    else:
-                        FDW.write(line)
-                    
-                    # prevtimingpoint = (time, inherited timing point beatLength, meter, sampleSet, sampleIndex, volume, effects)
-                    # Inherited timing point beatLength is -100 because it is treated as the default (which is -100) until an inherited timing point sets it.
-                    prevtimingpoint = (int(match.group(1)), -100, match.group(6), match.group(7), match.group(8), match.group(9), rest)
-                
-                # Inherited timing point matching
-                match = re.search(r"^(\d+),(-?\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),0,", line)
-                if match and insideTPts:
-                    unchangedline = False
-                    # Collect all sliders that occur before the currently processing timing point and after the previously processed timing point, and make their timing points
-                    matchingsliders = [s for s in sliders if (s[9] != 0 and (s[2] > prevtimingpoint[0] and s[2] < int(match.group(1))))]
-                    rest = re.sub(r"^(\d+),(-?\d+(\.\d+)?(E(\+|-)\d+)?),(\d+),(\d+),(\d+),(\d+),0,", "", line)
-                    if matchingsliders:
-                        for s in matchingsliders:
-                            # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2]-1, s[9], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[2]-1, prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2], 60000/(bpmpts[numpy.where(numpy.array(bpmpts)[:,0] == prevtimingpoint[0])[0][-1]][1]*prevtimingpoint[1]/-100), prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                            FDW.write("%d,%.15E,%s,%s,%s,%s,0,%s" % (s[2], prevtimingpoint[1], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
-                    
-                    # Override inherited timing point if it occurs at the same time as the sliders' timing points
-                    matchingsliders = [x for x in sliders if (x[9] != 0 and x[2] == int(match.group(1)))]
-                    if matchingsliders:
-                        s = matchingsliders[0]
-                        # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
-                        FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2]-1, s[9], match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                        FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[2]-1, match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                        FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[2], 60000/(bpmpts[numpy.where(numpy.array(bpmpts)[:,0] == s[2])[0][-1]][1]*float(match.group(2))/-100), match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                        FDW.write("%d,%s,%s,%s,%s,%s,0,%s" % (s[2], match.group(2), match.group(6), match.group(7), match.group(8), match.group(9), rest))
-                    else:
-                        FDW.write(line)
-                    
-                    # prevtimingpoint = (time, inherited timing point beatLength, meter, sampleSet, sampleIndex, volume, effects)
-                    prevtimingpoint = (int(match.group(1)), float(match.group(2)), match.group(6), match.group(7), match.group(8), match.group(9), rest)
+            # Override inherited timing point if it occurs at the same time as the sliders' timing points
+            i = sliderAt(record.Time)
+            if i >= 0:
+                s = (timeList[i], beatLengthList[i])
+                # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
+                FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[0]-1, s[1], record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+                FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[0]-1, record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+                FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[0], 60000/(timing.ScaledBpmAt(s[0])*float(record.BeatLength)/-100), record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+                FDW.write("%d,%s,%s,%s,%s,%s,0,%s" % (s[0], record.BeatLength, record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest))
+            else:
+                FDW.write(record.Line)
+            
+            # prevtimingpoint = (time, inherited timing point beatLength, meter, sampleSet, sampleIndex, volume, effects)
+            prevtimingpoint = (record.Time, float(record.BeatLength), record.Meter, record.SampleSet, record.SampleIndex, record.Volume, record.Rest)
+        
+        # Slider HitObject
+        elif isinstance(record, BeatmapParser.Slider):
+            i = sliderAt(record.Time)
+            if i >= 0:
+                FDW.write(sliderLine(i))
+            else:
+                FDW.write(record.Line)
+        
+        elif isinstance(record, BeatmapParser.Setting) and record.Key == "Version":
+            FDW.write("Version:%s-INVIS\n" % record.Value)
+        
+        else:
+            FDW.write(record.Line)
+
+# <summary>
+# Converts a .osu file without holding all of it, or all of its converted sliders, in memory.
+# The file is read twice. The first pass converts the sliders as they are read, a few at a time, and writes their lines
+# to a temporary file, keeping only the time and beat length of every slider and where the line of the first slider at each
+# time is. The second pass writes the new file, merging in the generated timing points from those records and copying
+# the converted lines back. The memory used thus grows with the largest slider, not with the map.
+# The timing points and the slider multiplier have to come before the sliders, like osu! writes them.
+# </summary>
+# <param name="FD">The .osu file to convert, open in text mode. It has to be seekable.</param>
+# <param name="FDW">The file to write to.</param>
+# <param name="name">What to call the file in error messages.</param>
+# <returns>A tuple (points, standardPoints, hits, sliders) like <see cref="convertFile"/> needs.</returns>
+
+@Profiler.Profiled
+def streamFile(FD, FDW, name, sliderJobs, compact, verify, cache, tolerance):
+    import numpy
+    import tempfile
+    from src.TimingIndex import TimingIndex
+    
+    gsv = -1
+    timingpoints = []
+    timing = None
+    pending = []
+    pendingFrames = 0
+    timedTimes = []
+    timedBeatLengths = []
+    spooled = {}
+    counts = [0, 0, 0, 0]
+    with tempfile.TemporaryFile() as spool:
+        for record in BeatmapParser.ParseBeatmap(FD):
+            if isinstance(record, BeatmapParser.Setting) and record.Key == "SliderMultiplier":
+                gsv = sliderMultiplier(record, gsv)
+            
+            elif isinstance(record, BeatmapParser.TimingPoint):
+                if timing != None:
+                    raise ValueError("The timing point at %d ms comes after sliders" % (record.Time))
+                timingpoints.append(record)
+            
+            elif isinstance(record, BeatmapParser.Slider) and record.Slides == 1 and not distorted(record.Positions):
+                if (gsv == -1):
+                    break
+                if timing == None:
+                    timing = TimingIndex(timingpoints)
                 
-                # Slider HitObject matching
-                match = re.search(r"^(-?\d+),(-?\d+),(\d+),(\d+),(\d+),(B|P|L)(\|(-?\d+:-?\d+))*,(\d+),(\d+(\.\d+)?)", line)
-                if match:
-                    unchangedline = False
-                    matchingsliders = [x for x in sliders if (x[9] != 0 and x[2] == int(match.group(3)))]
-                    if matchingsliders:
-                        s = matchingsliders[0]
-                        # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
-                        FDW.write("%d,%d,%d,%d,%d,L|%s,%d,%f%s" % (s[0], s[1], s[2]-1, s[3], s[4], "|".join(":".join(str(y) for y in x) for x in s[5]), s[6], s[7], s[8]))
-                    else:
-                        FDW.write(line)
-                        
-                match = re.search(r"^Version:(.*)$", line)
-                if match:
-                    unchangedline = False
-                    FDW.write("Version:%s-INVIS\n" % match.group(1))
-                    
-                if unchangedline:
-                    FDW.write(line)
-                    
-            FDW.close()
-            FD.close()
+                p = (timing.ScaledBpmAt(record.Time), gsv, record.X, record.Y, record.Time, record.ObjectType, record.HitSound, record.SliderType, record.Positions, record.Slides, record.Length, record.Rest)
+                pending.append(p)
+                pendingFrames = pendingFrames+frameCount(p[0], p[1], p[10])
+                if pendingFrames >= STREAM_CHUNK_FRAMES:
+                    spoolSliders(spool, spooled, timedTimes, timedBeatLengths, counts, pending, sliderJobs, compact, verify, cache, tolerance)
+                    pending = []
+                    pendingFrames = 0
+        
+        if (gsv == -1):
+            FDW.write("SliderMultiplier is NaN or not found in %s" % (name))
+            raise ValueError("SliderMultiplier is NaN or not found in %s" % (name))
+        spoolSliders(spool, spooled, timedTimes, timedBeatLengths, counts, pending, sliderJobs, compact, verify, cache, tolerance)
+        if timing == None:
+            timing = TimingIndex(timingpoints)
+        
+        times = numpy.concatenate(timedTimes)
+        order = numpy.argsort(times, kind='stable')
+        times = times[order]
+        def sliderLine(i):
+            offset, size = spooled[int(times[i])]
+            spool.seek(offset)
+            return spool.read(size).decode("utf8")
+        
+        FD.seek(0)
+        writeBeatmap(FDW, BeatmapParser.ParseBeatmap(FD), times, numpy.concatenate(timedBeatLengths)[order], sliderLine, timing)
+    return counts
+
+# <summary>
+# Converts some sliders for <see cref="streamFile"/> and appends the line of the first slider at each new time to the spool.
+# </summary>
+
+@Profiler.Profiled
+def spoolSliders(spool, spooled, timedTimes, timedBeatLengths, counts, pending, sliderJobs, compact, verify, cache, tolerance):
+    import numpy
+    
+    sliders, hits = convertSliders(pending, sliderJobs, compact, verify, cache, tolerance)
+    timed = numpy.flatnonzero(sliders.BeatLength != 0)
+    timedTimes.append(sliders.Time[timed])
+    timedBeatLengths.append(sliders.BeatLength[timed])
+    for i, time in zip(timed.tolist(), sliders.Time[timed].tolist()):
+        if time not in spooled:
+            line = sliders.Line(i).encode("utf8")
+            spool.seek(0, os.SEEK_END)
+            spooled[time] = (spool.tell(), len(line))
+            spool.write(line)
+    
+    counts[0] = counts[0]+len(sliders.ControlPoints)
+    counts[1] = counts[1]+sum(4*frameCount(p[0], p[1], p[10])+10 for p in pending)
+    counts[2] = counts[2]+hits
+    counts[3] = counts[3]+len(sliders)
+
+# <summary>
+# Finds the .osu and .osz files to convert from paths given on the command line, such as the Songs folder of osu!.
+# Converted files (see <see cref="outputName"/>) found in folders are skipped, so that converting a folder again does not convert them twice.
+# </summary>
+# <param name="paths">Paths of .osu or .osz files, of folders holding them, or glob patterns matching either ("**" matches any amount of folders).</param>
+# <param name="recursive">Whether to also search the subfolders of folders.</param>
+# <returns>A tuple (files, missing): a list of (file, base) tuples in a stable order without duplicates, where base is the folder the
+# file was found through, which the new file keeps its relative path to (see <see cref="outputPath"/>),
+# and a list of the paths that matched nothing.</returns>
+
+def findBeatmaps(paths, recursive=False):
+    import glob
+    
+    files = []
+    missing = []
+    seen = set()
+    def add(file, base):
+        key = os.path.normcase(os.path.abspath(file))
+        if key not in seen:
+            seen.add(key)
+            files.append((file, base))
+    
+    def addFolder(folder, base):
+        for directory, folders, names in os.walk(folder):
+            folders.sort()
+            if not recursive:
+                folders.clear()
+            for name in sorted(names):
+                if name.endswith((".osu", ".osz")) and not name.endswith(("-INVIS].osu", "-INVIS.osz")):
+                    add(os.path.normpath(os.path.join(directory, name)), base)
+    
+    for path in paths:
+        # The names of .osu files have brackets, which are also wildcards, so existing paths are never taken as patterns
+        if not os.path.exists(path) and glob.escape(path) != path:
+            # The base of a pattern is the part before its first wildcard
+            base = os.path.dirname(path)
+            while glob.escape(base) != base:
+                base = os.path.dirname(base)
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            base = path if os.path.isdir(path) else os.path.dirname(path)
+            matches = [path] if os.path.exists(path) else []
+        
+        if not matches:
+            missing.append(path)
+        for match in matches:
+            if os.path.isdir(match):
+                addFolder(match, base or ".")
+            elif match.endswith((".osu", ".osz")):
+                add(match, base or ".")
+    return files, missing
+
+# <summary>
+# The path the new file of a .osu file is written to by default: next to it, with "-INVIS" added to its difficulty name.
+# The new archive of a .osz file gets "-INVIS" added to its name.
+# </summary>
+
+def outputName(file):
+    if file.endswith(".osz"):
+        return file[:-4]+"-INVIS.osz"
+    if file.endswith("].osu"):
+        return file[:-5]+"-INVIS].osu"
+    return file[:-4]+" [INVIS].osu"
+
+# <summary>
+# The path the new file of a .osu file is written to in another folder, keeping the path of the file relative to a base folder.
+# </summary>
+# <param name="file">The path of the .osu file.</param>
+# <param name="base">The folder whose structure is kept, see <see cref="findBeatmaps"/>.</param>
+# <param name="outRoot">The folder to write to.</param>
+
+def outputPath(file, base, outRoot):
+    return os.path.join(outRoot, os.path.relpath(outputName(file), base))
+
+# <summary>
+# Writes the profile of a run of the converter as JSON.
+# </summary>
+# <param name="path">The file to write to, - for the standard output.</param>
+# <param name="files">A list holding the <see cref="Profiler.Report"/> of every file, with its path and that of its new file, or the error it failed with.</param>
+# <param name="total">The reports of all files added together.</param>
+
+def writeProfile(path, files, total):
+    import json
+    
+    profile = {"files": files, "total": total}
+    if path == "-":
+        json.dump(profile, sys.stdout, indent=1)
+        print()
+        return
+    with open(path, 'w', encoding="utf8") as FDW:
+        json.dump(profile, FDW, indent=1)
+
+# <summary>
+# Identifies the contents of a file without reading it.
+# </summary>
+# <returns>A tuple (size, modification time in ns), or None if the file does not exist.</returns>
+
+def outputStat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
             
-def processSlider(bpm, gsv, xpos, ypos, time, objtype, hitSound, sliderType, poslist, slides, length, rest):
+# <summary>
+# Reads a .osu file and finds everything needed to convert its sliders.
+# </summary>
+# <param name="lines">The lines of the file, such as an open text file.</param>
+# <returns>A tuple (records, gsv, timing, pending): the parsed records of every line, the global sv multiplier
+# (-1 if it was not found, in which case timing and pending are None), the <see cref="TimingIndex"/> of the map,
+# and a list holding the <see cref="processSlider"/> arguments of every slider to convert.</returns>
+
+@Profiler.Profiled
+def readBeatmap(lines):
+    records = []
+    
+    # Reading the file once, finding the global sv multiplier, making a list of bpm*sv points and
+    # searching for sliders with no reverses (slides=1) on the way
+    gsv = -1
+    timingpoints = []
+    pending = []
+    for record in BeatmapParser.ParseBeatmap(lines):
+        records.append(record)
+        
+        if isinstance(record, BeatmapParser.Setting) and record.Key == "SliderMultiplier":
+            gsv = sliderMultiplier(record, gsv)
+        
+        elif isinstance(record, BeatmapParser.TimingPoint):
+            timingpoints.append(record)
+        
+        elif isinstance(record, BeatmapParser.Slider):
+            # If a slider is already distorted somehow, we should not modify it.
+            if record.Slides == 1 and not distorted(record.Positions):
+                pending.append(record)
+    
+    if (gsv == -1):
+        return records, gsv, None, None
+    
+    import numpy
+    from src.TimingIndex import TimingIndex
+    
+    # The value passed to bpm isn't actually just the bpm - it's the bpm times the current sv multiplier, or what the bpm would have to be if the sv multiplier were 1  at that point.
+    timing = TimingIndex(timingpoints)
+    bpms = timing.ScaledBpms[timing.Lookup(numpy.array([r.Time for r in pending], dtype=numpy.int64))].tolist()
+    pending = [(bpms[i], gsv, r.X, r.Y, r.Time, r.ObjectType, r.HitSound, r.SliderType, r.Positions, r.Slides, r.Length, r.Rest) for i, r in enumerate(pending)]
+    return records, gsv, timing, pending
+
+# <summary>
+# Reads the global sv multiplier from a "SliderMultiplier" setting, clamped to the range osu! allows.
+# </summary>
+# <param name="record">The <see cref="BeatmapParser.Setting"/>.</param>
+# <param name="gsv">The value to keep if the setting is not a number.</param>
+
+def sliderMultiplier(record, gsv):
+    match = SLIDER_MULTIPLIER.match(record.Value)
+    if match:
+        gsv = float(match.group(0))
+        if (gsv < 0.4):
+            gsv = 0.4
+        if (gsv > 3.6):
+            gsv = 3.6
+    return gsv
+
+# <summary>
+# Converts sliders, optionally splitting them into chunks that are processed by a pool of worker processes.
+# Every slider only depends on its own arguments, so the result does not depend on the amount of workers.
+# </summary>
+# <param name="pending">A list holding the <see cref="processSlider"/> arguments of every slider.</param>
+# <param name="jobs">The number of worker processes. 1 converts all sliders in this process.</param>
+# <param name="chunkSize">The number of sliders handed to a worker at once. Defaults to a quarter of an even split between the workers.</param>
+# <param name="compact">Whether to use the compact slider encoding, see <see cref="processSlider"/>.</param>
+# <param name="tolerance">The tolerances slider paths are flattened with, see <see cref="convertFile"/>.</param>
+# <returns>The <see cref="SliderTable"/> of the converted sliders, in the order of pending.</returns>
+
+@Profiler.Profiled
+def processSliders(pending, jobs=1, chunkSize=None, compact=False, tolerance=None):
+    if jobs <= 1 or len(pending) < 2:
+        return processSliderChunk(pending, compact, tolerance)
+    
+    if chunkSize == None:
+        chunkSize = max((1, -(-len(pending)//(jobs*4))))
+    chunks = [pending[i:i+chunkSize] for i in range(0, len(pending), chunkSize)]
+    
+    tables = []
+    profiling = Profiler.ACTIVE != None
+    import concurrent.futures
+    from src.SliderTable import SliderTable
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map returns the results in the order of the chunks, whichever worker finishes first
+        for chunk, report in executor.map(workerSliderChunk, chunks, [compact]*len(chunks), [profiling]*len(chunks), [tolerance]*len(chunks)):
+            tables.append(chunk)
+            if report != None:
+                Profiler.ACTIVE.Merge(report)
+    return SliderTable.Concatenate(tables)
+
+# <summary>
+# Converts sliders like <see cref="processSliderChunk"/> in a worker process of <see cref="processSliders"/>.
+# </summary>
+# <param name="profile">Whether to profile the conversion, since the profiler of the parent process is not seen by the worker.</param>
+# <returns>A tuple (sliders, report): the <see cref="SliderTable"/> of the converted sliders, and the <see cref="Profiler.Report"/> of the conversion or None.</returns>
+
+def workerSliderChunk(pending, compact, profile, tolerance):
+    if not profile:
+        return processSliderChunk(pending, compact, tolerance), None
+    with Profiler.Profiling() as profiler:
+        return processSliderChunk(pending, compact, tolerance), profiler.Report()
+
+# <summary>
+# Converts sliders like <see cref="processSliders"/>, reusing the sliders found in a cache and storing the others in it.
+# The sliders are cached in chunks of consecutive ones, one entry each, which keeps the amount of files in the cache and
+# of lookups down. A slider is identified by everything its control points, length and timing depend on, its head position,
+# shape, length, bpm and slider multiplier, and the chunks end at sliders chosen by that alone (see <see cref="cacheChunks"/>),
+# so a chunk is found again at any time in any map with the same sliders in the same order. Adding, removing or changing
+# a slider only changes the chunk it is in, not those after it.
+# </summary>
+# <param name="pending">A list holding the <see cref="processSlider"/> arguments of every slider.</param>
+# <param name="jobs">The number of worker processes converting the sliders not found in the cache.</param>
+# <param name="compact">Whether to use the compact slider encoding.</param>
+# <param name="cache">The <see cref="ConversionCache"/>.</param>
+# <param name="tolerance">The tolerances slider paths are flattened with, see <see cref="convertFile"/>. Sliders found in the cache are not
+# part of the tolerances "auto" tries.</param>
+# <returns>A tuple (sliders, hits): the <see cref="SliderTable"/> of the converted sliders in the order of pending, and how many of them came from the cache.</returns>
+
+@Profiler.Profiled
+def cachedProcessSliders(pending, jobs, compact, cache, tolerance=None):
+    from src.SliderTable import SliderTable
+    
+    # (bpm, gsv, xpos, ypos, time, objtype, hitSound, sliderType, poslist, slides, length, rest)
+    sliderKeys = [ConversionCache.Key(p[0], p[1], p[2], p[3], p[7], tuple(p[8]), p[10]) for p in pending]
+    bounds = cacheChunks(sliderKeys)
+    chunks = [pending[start:end] for start, end in bounds]
+    keys = [ConversionCache.Key(CONVERTER_VERSION, compact, effectiveTolerance(tolerance), tuple(sliderKeys[start:end])) for start, end in bounds]
+    cached = [cache.Get("sliders", key) for key in keys]
+    
+    # The chunks that missed are converted together, so that the sliders of all of them are shared between the workers
+    misses = [i for i in range(0, len(chunks)) if cached[i] == None]
+    converted = processSliders([p for i in misses for p in chunks[i]], jobs, compact=compact, tolerance=tolerance)
+    start = 0
+    for i in misses:
+        cached[i] = converted.Columns(start, start+len(chunks[i]))
+        cache.Put("sliders", keys[i], cached[i])
+        start = start+len(chunks[i])
+    
+    tables = [SliderTable.FromColumns(chunks[i], cached[i]) for i in range(0, len(chunks))]
+    return SliderTable.Concatenate(tables), len(pending)-len(converted)
+
+# <summary>
+# Splits sliders into the chunks <see cref="cachedProcessSliders"/> caches together. A chunk ends at every slider whose key
+# is a multiple of <see cref="CACHE_CHUNK_SLIDERS"/>, which happens for one slider in that many on average, or once
+# it holds four times as many. Where chunks end thus depends on the sliders only, not on their position in the map.
+# </summary>
+# <param name="keys">The hexadecimal <see cref="ConversionCache.Key"/> of every slider, in map order.</param>
+# <returns>A list of (start, end) tuples: the sliders of every chunk are those from start up to end.</returns>
+
+def cacheChunks(keys):
+    bounds = []
+    start = 0
+    for i in range(0, len(keys)):
+        if int(keys[i][:8], 16)%CACHE_CHUNK_SLIDERS == 0 or i+1-start >= 4*CACHE_CHUNK_SLIDERS:
+            bounds.append((start, i+1))
+            start = i+1
+    if start < len(keys):
+        bounds.append((start, len(keys)))
+    return bounds
+
+@Profiler.Profiled
+def processSliderChunk(pending, compact=False, tolerance=None):
+    from src.SliderPath import SliderPath
+    from src.SliderTable import SliderTable
+    
+    converted = []
+    
+    # Computing the paths of all sliders at once
+    controlPointSets = [sliderControlPoints(s[2], s[3], s[7], s[8]) for s in pending]
+    offsets, paths, lengths, calculatedLengths = SliderPath.ComputeMany(controlPointSets, [s[10] for s in pending], PATH_CACHE, *effectiveTolerance(tolerance, ()))
+    for i in range(0, len(pending)):
+        sliderpath = SliderPath.FromComputed(controlPointSets[i], pending[i][10], paths[offsets[i]:offsets[i+1]], lengths[offsets[i]:offsets[i+1]], calculatedLengths[i])
+        converted.append(processSlider(*pending[i], sliderpath=sliderpath, compact=compact))
+    
+    if tolerance == "auto":
+        tryTolerances(pending, controlPointSets)
+    return SliderTable.FromConverted(pending, converted)
+
+# <summary>
+# The tolerances the sliders of a conversion are made with, which are osu!'s for "auto".
+# </summary>
+# <param name="tolerance">The tolerances, see <see cref="convertFile"/>.</param>
+# <param name="default">What to give for osu!'s tolerances.</param>
+
+def effectiveTolerance(tolerance, default=None):
+    return default if tolerance == None or tolerance == "auto" else tolerance
+
+# <summary>
+# Flattens the paths of sliders with every multiple of osu!'s tolerances in <see cref="TOLERANCE_SCALES"/>, and with osu!'s own,
+# and checks whether each puts the sliderball at the same rounded positions as osu!'s. For every multiple x, and for 1,
+# the counts "tolerance_x_vertices" (flattened vertices), "tolerance_x_seconds" (time spent flattening) and "tolerance_x_mismatches"
+# (sliders whose sliderball moves) are added to the active <see cref="Profiler"/>, see <see cref="toleranceReport"/>.
+# The paths are flattened without the <see cref="PATH_CACHE"/> and the fastest of <see cref="TOLERANCE_RUNS"/> runs is timed, after
+# one run that is not, so that the times compare.
+# </summary>
+# <param name="pending">A list holding the <see cref="processSlider"/> arguments of every slider.</param>
+# <param name="controlPointSets">The control points of every slider, see <see cref="sliderControlPoints"/>.</param>
+
+@Profiler.Profiled
+def tryTolerances(pending, controlPointSets):
+    import numpy
+    import src.PathApproximator as PathApproximator
+    from src.SliderPath import SliderPath
+    
+    frames = [frameCount(p[0], p[1], p[10]) for p in pending]
+    standard = None
+    sliderLengths = [p[10] for p in pending]
+    Profiler.Count("tolerance_sliders", len(pending))
+    SliderPath.ComputeMany(controlPointSets, sliderLengths, None, PathApproximator.BEZIER_TOLERANCE, PathApproximator.CIRCULAR_ARC_TOLERANCE)
+    for scale in (1,)+TOLERANCE_SCALES:
+        seconds = float("inf")
+        for run in range(0, TOLERANCE_RUNS):
+            start = time.perf_counter()
+            offsets, paths, lengths, calculatedLengths = SliderPath.ComputeMany(controlPointSets, sliderLengths, None, scale*PathApproximator.BEZIER_TOLERANCE, scale*PathApproximator.CIRCULAR_ARC_TOLERANCE)
+            seconds = min((seconds, time.perf_counter()-start))
+        Profiler.Count("tolerance_x%g_seconds" % (scale), seconds)
+        Profiler.Count("tolerance_x%g_vertices" % (scale), len(paths))
+        
+        positions = []
+        for i in range(0, len(pending)):
+            sliderpath = SliderPath.FromComputed(controlPointSets[i], pending[i][10], paths[offsets[i]:offsets[i+1]], lengths[offsets[i]:offsets[i+1]], calculatedLengths[i])
+            try:
+                # Like processSlider, which does not use the last position
+                xpoints, ypoints = sliderpath.SamplePositions(frames[i])
+                positions.append((xpoints[:frames[i]], ypoints[:frames[i]]))
+            except ValueError:
+                positions.append(None)
+        if standard == None:
+            standard = positions
+        
+        mismatches = 0
+        for a, b in zip(standard, positions):
+            if a is None or b is None or not (numpy.array_equal(a[0], b[0]) and numpy.array_equal(a[1], b[1])):
+                mismatches = mismatches+1
+        Profiler.Count("tolerance_x%g_mismatches" % (scale), mismatches)
+
+# <summary>
+# Picks the coarsest tolerance that put the sliderball at the same positions as osu!'s for every slider tried by <see cref="tryTolerances"/>.
+# </summary>
+# <param name="counts">The counts of a <see cref="Profiler"/> the tries were counted in, such as those of a report made by <see cref="convertFile"/>.</param>
+# <returns>None if no slider was tried, otherwise a dict {"sliders", "tolerance", "vertices", "seconds", "standard_tolerance", "standard_vertices",
+# "standard_seconds", "moved"}: the amount of sliders, the (bezier, circular arc) tolerance picked, the vertices it flattened and the time it took
+# next to osu!'s tolerance, vertices and time, and the amount
+# of sliders each multiple in <see cref="TOLERANCE_SCALES"/> moved the sliderball in, by multiple. The tolerance is osu!'s if no coarser one
+# gave the same positions, or if the coarsest that did flattens as many vertices.</returns>
+
+def toleranceReport(counts):
+    import src.PathApproximator as PathApproximator
+    
+    if counts.get("tolerance_sliders", 0) == 0:
+        return None
+    scale = next((x for x in TOLERANCE_SCALES if counts["tolerance_x%g_mismatches" % (x)] == 0), 1)
+    if counts["tolerance_x%g_vertices" % (scale)] == counts["tolerance_x1_vertices"]:
+        # A coarser tolerance flattening the same vertices saves nothing, whatever its time says
+        scale = 1
+    return {"sliders": counts["tolerance_sliders"],
+            "tolerance": (scale*PathApproximator.BEZIER_TOLERANCE, scale*PathApproximator.CIRCULAR_ARC_TOLERANCE),
+            "vertices": counts["tolerance_x%g_vertices" % (scale)], "seconds": counts["tolerance_x%g_seconds" % (scale)],
+            "standard_tolerance": (PathApproximator.BEZIER_TOLERANCE, PathApproximator.CIRCULAR_ARC_TOLERANCE),
+            "standard_vertices": counts["tolerance_x1_vertices"], "standard_seconds": counts["tolerance_x1_seconds"],
+            "moved": dict((x, counts["tolerance_x%g_mismatches" % (x)]) for x in TOLERANCE_SCALES)}
+
+# <summary>
+# Prints what <see cref="toleranceReport"/> found.
+# </summary>
+
+def printTolerance(name, report):
+    if report == None:
+        print("%s: no sliders were converted to try tolerances on" % (name))
+    elif report["tolerance"][0] == report["standard_tolerance"][0]:
+        scale = TOLERANCE_SCALES[-1]
+        if report["moved"][scale] == 0:
+            print("%s: no coarser tolerance puts the sliderball at the same positions with fewer vertices" % (name))
+        else:
+            print("%s: no coarser tolerance puts the sliderball at the same positions; %g times osu!'s moves it in %d of %d sliders" % (name, scale, report["moved"][scale], report["sliders"]))
+    else:
+        print("%s: --tolerance %g,%g puts the sliderball at the same positions, flattening %d instead of %d vertices (-%.1f%%) in %.3f s instead of %.3f s" % (
+            name, report["tolerance"][0], report["tolerance"][1], report["vertices"], report["standard_vertices"],
+            100*(report["standard_vertices"]-report["vertices"])/report["standard_vertices"], report["seconds"], report["standard_seconds"]))
+
+# <summary>
+# Reads the value of --tolerance.
+# </summary>
+# <returns>"auto", or a tuple (bezier tolerance, circular arc tolerance).</returns>
+
+def toleranceArgument(value):
+    if value == "auto":
+        return value
+    try:
+        tolerance = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        tolerance = ()
+    if len(tolerance) != 2 or not all(0 < t < float("inf") for t in tolerance):
+        raise argparse.ArgumentTypeError("expected auto or two positive numbers like 0.25,0.1, not %r" % (value))
+    return tolerance
+
+def writeSliderTimingPoints(FDW, times, beatLengths, start, end, prevtimingpoint, timing):
+    import bisect
+    
+    # Sliders are given by their time and beat length sorted by time; the ones from start up to end (or all remaining ones if end is None) are written.
+    # Those at the time of the previously processed timing point have overridden it instead and are skipped.
+    stop = len(times) if end == None else max((start, bisect.bisect_left(times, end, start)))
+    for i in range(bisect.bisect_right(times, prevtimingpoint[0], start, stop), stop):
+        s = (times[i], beatLengths[i])
+        # We move the slider back one ms so that timing for the rest of the song doesn't get offset by +1ms
+        FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[0]-1, s[1], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
+        FDW.write("%d,NaN,%s,%s,%s,%s,0,%s" % (s[0]-1, prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
+        FDW.write("%d,%.15E,%s,%s,%s,%s,1,%s" % (s[0], 60000/(timing.ScaledBpmAt(prevtimingpoint[0])*prevtimingpoint[1]/-100), prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
+        FDW.write("%d,%.15E,%s,%s,%s,%s,0,%s" % (s[0], prevtimingpoint[1], prevtimingpoint[2], prevtimingpoint[3], prevtimingpoint[4], prevtimingpoint[5], prevtimingpoint[6]))
+    return stop
+
+@Profiler.Profiled
+def sliderControlPoints(xpos, ypos, sliderType, poslist):
+    import numpy
+    from src.PathControlPoint import PathControlPoint
+    
     if sliderType == "L":
         pathtype = PathControlPoint.LINEAR
     elif sliderType == "P":
@@ -206,73 +948,148 @@ def processSlider(bpm, gsv, xpos, ypos, time, objtype, hitSound, sliderType, pos
         else:
             ControlPoints.append(PathControlPoint(numpy.array(poslist[i], dtype='int64'), None))
         
-    sliderpath = SliderPath(ControlPoints, length)
-    
-    xpoints = []
-    ypoints = []
-    tlen = round(1000*length/(5/3*bpm*gsv))
-    
-    # sliderpath.PositionAt returns the loaction of the sliderball pre-snap. We want post-snap so this requires some additional structure.
-    # First we calculate how many ms each linear segment is used for
-    mspersegment = [0]*len(sliderpath.cumulativeLength)
-    for i in range(0,tlen+1):
-        idx = sliderpath.indexOfDistance(sliderpath.progressToDistance(i/tlen))
-        if idx < 0:
-            idx = 0
-        if idx > len(mspersegment):
-            idx = len(mspersegment)-1
-        mspersegment[idx] += 1
-    # Edge case handled separately; if the index of the progress to distance is 0 then we consider it to simply be the first point.
-    for j in range(0,mspersegment[0]):
-        pt = sliderpath.calculatedPath[0]
-        xpoints.append(round(pt[0]))
-        ypoints.append(round(pt[1]))
-    for i in range(1,len(mspersegment)):
-        p0 = sliderpath.calculatedPath[i-1]
-        p1 = sliderpath.calculatedPath[i]
-        for j in range(1,mspersegment[i]+1):
-            pt = p0+(p1-p0)*j/mspersegment[i]
-            xpoints.append(round(pt[0]))
-            ypoints.append(round(pt[1]))
-    
-    # Define newposlist
-    newposlist = []
-    framedist = 2*67141632+2*33587200+xpos+ypos-xpoints[0]-ypoints[0]
-    snaptol = 50000;
+    return ControlPoints
+
+# <summary>
+# The amount of milliseconds a slider lasts, which is the amount of positions the sliderball is placed at.
+# </summary>
+
+def frameCount(bpm, gsv, length):
+    return round(1000*length/(5/3*bpm*gsv))
+
+# <summary>
+# Makes the invisible version of a slider. Every millisecond, the slider's path leaves the playfield
+# and comes back to the position the sliderball should appear at, always travelling the same distance.
+# The compact encoding shortens the trip when the sliderball stays on the same row or column as in the
+# previous millisecond: one corner replaces the three the trip normally needs when it stays on the same row,
+# two when it stays on the same column. The trip keeps its length and still ends with the long
+# horizontal segment into the sliderball position, so the sliderball appears at the same positions.
+# </summary>
+# <param name="sliderpath">The already computed path of the slider, computed here if None.</param>
+# <param name="compact">Whether to use the compact encoding.</param>
+# <param name="tolerance">The tolerances to compute the path with, see <see cref="convertFile"/>.</param>
+# <returns>A tuple (control points, length, beat length of the slider's timing point). The control points are an (n, 2) int64 array,
+# see <see cref="controlPointStream"/>. The other fields of the converted slider are those of the original one, see <see cref="SliderTable.FromConverted"/>.</returns>
+
+@Profiler.Profiled
+def processSlider(bpm, gsv, xpos, ypos, time, objtype, hitSound, sliderType, poslist, slides, length, rest, sliderpath=None, compact=False, tolerance=None):
+    if sliderpath == None:
+        from src.SliderPath import SliderPath
+        sliderpath = SliderPath(sliderControlPoints(xpos, ypos, sliderType, poslist), length, PATH_CACHE, *effectiveTolerance(tolerance, ()))
     
-    newposlist.append((4196352+xpos, ypos))
-    newposlist.append((4196352+xpos, 2099200+ypos))
-    newposlist.append((8392704+xpos, 2099200+ypos))
-    newposlist.append((8392704+xpos, 4198400+ypos))
-    newposlist.append((16785408+xpos, 4198400+ypos))
-    newposlist.append((16785408+xpos, 8396800+ypos))
-    newposlist.append((33570816+xpos, 8396800+ypos))
-    newposlist.append((33570816+xpos, 16793600+ypos))
-    newposlist.append((67141632+xpos, 16793600+ypos))
-    newposlist.append((67141632+xpos, 33587200+ypos+snaptol))
-    newposlist.append((67141632+xpos, ypoints[0]))
-    newposlist.append((xpoints[0], ypoints[0]))
-    curlen = framedist+2*snaptol;
-    for t in range(1,tlen):
-        newposlist.append((67141632+xpos, ypoints[t-1]))
-        newposlist.append((67141632+xpos, round(33587200+0.5*(ypos-xpos+xpoints[t-1]+xpoints[t]+ypoints[t-1]+ypoints[t]-xpoints[0]-ypoints[0]))))
-        if ((ypos-xpos+xpoints[t-1]+xpoints[t]+ypoints[t-1]+ypoints[t]-xpoints[0]-ypoints[0]) % 2 == 1):
-            curlen = curlen+1
-        
-        # This adds and subtracts a bunch of things to cancel everything
-        # out (sometimes the rounding will add an extra pixel) and make
-        # sure the length the slider travels to get to each pixel we want
-        # the sliderball to appear on stays the same.
+    tlen = frameCount(bpm, gsv, length)
+    
+    # sliderpath.PositionAt returns the loaction of the sliderball pre-snap. We want post-snap, which SamplePositions gives us.
+    xpoints, ypoints = sliderpath.SamplePositions(tlen)
+    newposlist, curlen, framedist = controlPointStream(xpos, ypos, xpoints[:tlen], ypoints[:tlen], compact)
         
-        newposlist.append((67141632+xpos, ypoints[t]))
-        newposlist.append((xpoints[t], ypoints[t]))
-        curlen = curlen + framedist
+    return (newposlist, curlen, 5/3*gsv*60/framedist)
+
+# <summary>
+# Makes the control points of an invisible slider from the positions the sliderball should appear at, see <see cref="processSlider"/>.
+# </summary>
+# <param name="xpos">The x position of the slider head.</param>
+# <param name="ypos">The y position of the slider head.</param>
+# <param name="xpoints">An int64 array holding the x position of the sliderball at every millisecond.</param>
+# <param name="ypoints">An int64 array holding the y position of the sliderball at every millisecond.</param>
+# <param name="compact">Whether to use the compact encoding.</param>
+# <returns>A tuple (control points, length, framedist): the control points following the slider head as an (n, 2) int64 array,
+# the length of the slider and the distance the sliderball travels every millisecond.</returns>
+
+@Profiler.Profiled
+def controlPointStream(xpos, ypos, xpoints, ypoints, compact=False):
+    import numpy
+    
+    tlen = len(xpoints)
+    framedist = 2*67141632+2*33587200+xpos+ypos-int(xpoints[0])-int(ypoints[0])
+    snaptol = 50000;
+    
+    newposlist = numpy.empty((4*tlen+10, 2), dtype=numpy.int64)
+    newposlist[:12] = ((4196352+xpos, ypos), (4196352+xpos, 2099200+ypos), (8392704+xpos, 2099200+ypos), (8392704+xpos, 4198400+ypos),
+                       (16785408+xpos, 4198400+ypos), (16785408+xpos, 8396800+ypos), (33570816+xpos, 8396800+ypos), (33570816+xpos, 16793600+ypos),
+                       (67141632+xpos, 16793600+ypos), (67141632+xpos, 33587200+ypos+snaptol), (67141632+xpos, ypoints[0]), (xpoints[0], ypoints[0]))
+    
+    # Every millisecond t after the first goes right, up, down and back left to the next position the sliderball should appear on
+    sums = ypos-xpos+xpoints[:-1]+xpoints[1:]+ypoints[:-1]+ypoints[1:]-xpoints[0]-ypoints[0]
+    top = numpy.rint(33587200+0.5*sums).astype(numpy.int64)
+    frames = newposlist[12:12+4*(tlen-1)].reshape((tlen-1, 4, 2))
+    frames[:, 0:3, 0] = 67141632+xpos
+    frames[:, 0, 1] = ypoints[:-1]
+    frames[:, 1, 1] = top
+    frames[:, 2, 1] = ypoints[1:]
+    frames[:, 3, 0] = xpoints[1:]
+    frames[:, 3, 1] = ypoints[1:]
+    
+    # This adds and subtracts a bunch of things to cancel everything
+    # out (sometimes the rounding will add an extra pixel) and make
+    # sure the length the slider travels to get to each pixel we want
+    # the sliderball to appear on stays the same.
+    curlen = tlen*framedist+2*snaptol+int(numpy.count_nonzero(sums % 2 == 1))
     
     # Fixes some rendering issues by making the last segment of length 0
-    newposlist.append(newposlist[-1])
-    newposlist.append(newposlist[-1])
+    newposlist[-2:] = newposlist[-3]
+    
+    if compact:
+        keep = numpy.ones((tlen-1, 4), dtype=bool)
+        
+        # Going right and back along the row is as long as going right, up, down and back
+        row = ypoints[1:] == ypoints[:-1]
+        frames[row, 2, 0] = 67141632+xpos+top[row]-ypoints[1:][row]
+        keep[row, 0:2] = False
+        
+        column = (xpoints[1:] == xpoints[:-1]) & ~row
+        frames[column, 1:3, 0] = (67141632+xpos+top[column]-numpy.maximum(ypoints[:-1], ypoints[1:])[column])[:, None]
+        frames[column, 1, 1] = ypoints[:-1][column]
+        keep[column, 0] = False
         
-    return (xpos, ypos, time, objtype, hitSound, newposlist, slides, curlen, rest, 5/3*gsv*60/framedist)
+        newposlist = numpy.concatenate((newposlist[:12], frames[keep], newposlist[-2:]))
+    
+    return newposlist, curlen, framedist
+
+# <summary>
+# Finds where the sliderball is at every millisecond of a slider made by <see cref="processSlider"/>.
+# Every segment of such a slider is horizontal or vertical, so the positions are computed exactly with integers.
+# </summary>
+# <param name="xpos">The x position of the slider head.</param>
+# <param name="ypos">The y position of the slider head.</param>
+# <param name="controlPoints">The control points following the slider head.</param>
+# <param name="framedist">The distance the sliderball travels every millisecond.</param>
+# <param name="count">The amount of milliseconds.</param>
+# <returns>An int64 array of shape (count+1, 2) holding the sliderball position at every millisecond, the last ones clamped to the end of the path.</returns>
+
+def ballPositions(xpos, ypos, controlPoints, framedist, count):
+    import numpy
+    
+    points = numpy.concatenate((numpy.array([(xpos, ypos)], dtype=numpy.int64), controlPoints))
+    segments = numpy.diff(points, axis=0)
+    if (numpy.count_nonzero(segments, axis=1) > 1).any():
+        raise ValueError("The path has segments that are neither horizontal nor vertical")
+    
+    cumulative = numpy.concatenate(([0], numpy.cumsum(numpy.abs(segments).sum(axis=1))))
+    distances = numpy.minimum(numpy.arange(count+1, dtype=numpy.int64)*framedist, cumulative[-1])
+    indices = numpy.minimum(numpy.searchsorted(cumulative, distances, side='right')-1, len(segments)-1)
+    return points[indices]+numpy.sign(segments[indices])*(distances-cumulative[indices])[:, None]
+
+# <summary>
+# Checks that the compact encoding of a slider puts the sliderball at the same positions as the standard one.
+# </summary>
+# <param name="xpos">The x position of the slider head.</param>
+# <param name="ypos">The y position of the slider head.</param>
+# <param name="standard">What <see cref="processSlider"/> made of the slider without compact.</param>
+# <param name="compact">What it made of the same slider with compact.</param>
+# <returns>True if the lengths and beat lengths are the same and the sliderball positions are identical at every millisecond.</returns>
+
+@Profiler.Profiled
+def verifyCompactSlider(xpos, ypos, standard, compact):
+    import numpy
+    
+    if standard[1:] != compact[1:]:
+        return False
+    
+    first = standard[0][11]
+    framedist = 2*67141632+2*33587200+xpos+ypos-first[0]-first[1]
+    count = (len(standard[0])-14)//4+1
+    return numpy.array_equal(ballPositions(xpos, ypos, standard[0], framedist, count), ballPositions(xpos, ypos, compact[0], framedist, count))
 
 def distorted(poslist):
     minx = min(pos[0] for pos in poslist)
@@ -283,4 +1100,7 @@ def distorted(poslist):
     return maxx-minx > 2**14 or maxy-miny > 2**14
     
 
-if __name__=="__main__": main()
\ No newline at end of file
+if __name__=="__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,11 @@
+import importlib.util
+import os
+import sys
+
+# The repository is the src package itself, so it is only importable as src from the folder holding the checkout.
+# Loading it under that name here lets the tests run from the checkout, like the converter does from its parent folder.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "src" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("src", os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT])
+    sys.modules["src"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules["src"])
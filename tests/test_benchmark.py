@@ -0,0 +1,28 @@
+import src.BeatmapParser as BeatmapParser
+import src.benchmark as benchmark
+
+
+def sliders(text):
+    return [record for record in BeatmapParser.ParseBeatmap(text.splitlines(True)) if isinstance(record, BeatmapParser.Slider)]
+
+
+def test_synthetic_maps_are_reproducible_and_cover_every_slider_type():
+    for name, timingPointsPerSlider, options in benchmark.SUITE_MAPS:
+        text = benchmark.syntheticBeatmap(40, int(40*timingPointsPerSlider), **options)
+        assert text == benchmark.syntheticBeatmap(40, int(40*timingPointsPerSlider), **options)
+
+        generated = sliders(text)
+        assert len(generated) == 40
+        assert set(slider.SliderType for slider in generated) == set(options["sliderTypes"])
+        if options.get("segments", 1) > 1:
+            # Bezier segments are joined by red anchors, a control point given twice in a row
+            anchored = [s for s in generated if s.SliderType == "B" and any(a == b for a, b in zip(s.Positions, s.Positions[1:]))]
+            assert len(anchored) == len([s for s in generated if s.SliderType == "B"])
+
+
+def test_suite_measures_every_map_and_step():
+    results = benchmark.benchmarkConvert(10, 1)+benchmark.benchmarkMicro(10, 1)
+    names = [result["name"] for result in results]
+    assert names[:len(benchmark.SUITE_MAPS)] == ["convert/%s" % (name) for name, _, _ in benchmark.SUITE_MAPS]
+    assert {"ApproximateBezier", "ApproximateCircularArc", "SliderPath/bezier_anchors", "processSlider/perfect"} <= set(names)
+    assert all(result["seconds"] > 0 for result in results)
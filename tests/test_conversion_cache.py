@@ -0,0 +1,56 @@
+import os
+
+from src.ConversionCache import ConversionCache
+import src.benchmark as benchmark
+import src.main as main
+
+
+def convertSliders(text, cache):
+    return main.convertSliders(main.readBeatmap(text.splitlines(True))[3], 1, False, False, cache, None)
+
+
+def test_sliders_are_cached_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_CHUNK_SLIDERS", 4)
+    cache = ConversionCache(str(tmp_path/"cache"))
+    text = benchmark.syntheticBeatmap(200, 50, sliderTypes="LPB", lengths=(20, 60))
+    header, hitObjects = text.split("[HitObjects]\n")
+    lines = hitObjects.splitlines(True)
+
+    assert main.convertBeatmap(text, cache=cache) == main.convertBeatmap(text)
+    chunks = len(os.listdir(tmp_path/"cache"/"sliders"))
+    assert 10 < chunks < 200
+    sliders, hits = convertSliders(text, cache)
+    assert (len(sliders), hits) == (200, 200)
+
+    # Inserting, removing or changing a slider only converts the chunk it is in again, of at most 16 sliders
+    inserted = "%s[HitObjects]\n%s%s" % (header, "10,10,500,2,0,L|40:40,1,30\n", "".join(lines))
+    removed = "%s[HitObjects]\n%s" % (header, "".join(lines[:100]+lines[101:]))
+    changed = "%s[HitObjects]\n%s" % (header, "".join(lines[:150]+["1"+lines[150]]+lines[151:]))
+    for edited, count in ((inserted, 201), (removed, 199), (changed, 200)):
+        sliders, hits = convertSliders(edited, cache)
+        assert len(sliders) == count
+        assert hits >= count-16
+        assert main.convertBeatmap(edited, cache=cache) == main.convertBeatmap(edited)
+
+
+def test_chunks_end_at_the_same_sliders_wherever_they_are(monkeypatch):
+    monkeypatch.setattr(main, "CACHE_CHUNK_SLIDERS", 4)
+    keys = [ConversionCache.Key(i) for i in range(0, 100)]
+    chunks = [tuple(keys[start:end]) for start, end in main.cacheChunks(keys)]
+    shifted = [tuple((["0"*64]+keys)[start:end]) for start, end in main.cacheChunks(["0"*64]+keys)]
+    assert [key for chunk in chunks for key in chunk] == keys
+    assert all(len(chunk) <= 16 for chunk in chunks)
+    assert shifted[0] == ("0"*64,) and shifted[1:] == chunks
+
+
+def test_verifying_is_not_skipped_by_an_unverified_conversion(tmp_path):
+    cache = ConversionCache(str(tmp_path/"cache"))
+    source = tmp_path/"map.osu"
+    source.write_text(benchmark.syntheticBeatmap(20, 5, sliderTypes="LPB"), encoding="utf8")
+    output = str(tmp_path/"output.osu")
+
+    # (file hits, file misses, slider hits, slider misses)
+    assert main.convertFile(str(source), output, compact=True, cache=cache)[3] == (0, 1, 0, 20)
+    assert main.convertFile(str(source), output, compact=True, cache=cache)[3] == (1, 0, 0, 0)
+    assert main.convertFile(str(source), output, compact=True, verify=True, cache=cache)[3] == (0, 1, 20, 0)
+    assert main.convertFile(str(source), output, compact=True, verify=True, cache=cache)[3] == (1, 0, 0, 0)
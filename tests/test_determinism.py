@@ -0,0 +1,32 @@
+import random
+
+import src.main as main
+
+
+# Diagonal sliders with irrational lengths between axis-aligned ones, whose frames land exactly on their vertices,
+# so that any rounding depending on the sliders converted along with one moves its sliderball by a pixel
+def beatmap(sliderCount=400, seed=1):
+    rng = random.Random(seed)
+    lines = ["osu file format v14\n", "\n", "[Metadata]\n", "Version:Test\n", "\n",
+             "[Difficulty]\n", "SliderMultiplier:1\n", "SliderTickRate:1\n", "\n",
+             "[TimingPoints]\n", "0,100,4,2,0,60,1,0\n", "\n", "\n", "[HitObjects]\n"]
+    for i in range(0, sliderCount):
+        x = rng.randint(0, 400)
+        y = rng.randint(0, 280)
+        if i%2:
+            lines.append("%d,%d,%d,2,0,L|%d:%d|%d:%d,1,200\n" % (x, y, 1000+i*1000, x+100, y, x+100, y+100))
+        else:
+            lines.append("%d,%d,%d,2,0,L|%d:%d,1,%d\n" % (x, y, 1000+i*1000, x+rng.randint(1, 90), y+rng.randint(1, 90), rng.randint(20, 60)))
+    return "".join(lines)
+
+
+def test_output_does_not_depend_on_how_sliders_are_batched(tmp_path, monkeypatch):
+    text = beatmap()
+    expected = main.convertBeatmap(text)
+    assert main.convertBeatmap(text, sliderJobs=3) == expected
+
+    source = tmp_path/"map.osu"
+    source.write_text(text, encoding="utf8")
+    monkeypatch.setattr(main, "STREAM_CHUNK_FRAMES", 1000)
+    main.convertFile(str(source), str(tmp_path/"streamed.osu"), stream=True)
+    assert (tmp_path/"streamed.osu").read_text(encoding="utf8") == expected
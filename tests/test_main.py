@@ -0,0 +1,34 @@
+import pytest
+
+import src.main as main
+
+
+def test_verify_needs_compact(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit:
+        main.main(["--verify", str(tmp_path)])
+    assert exit.value.code == 2
+    assert "--verify checks the compact encoding and needs --compact" in capsys.readouterr().err
+
+
+def toleranceCounts(vertices, mismatches):
+    counts = {"tolerance_sliders": 10, "tolerance_x1_vertices": 326, "tolerance_x1_seconds": 0.015, "tolerance_x1_mismatches": 0}
+    for scale in main.TOLERANCE_SCALES:
+        counts["tolerance_x%g_vertices" % (scale)] = vertices.get(scale, 326)
+        counts["tolerance_x%g_seconds" % (scale)] = 0.003
+        counts["tolerance_x%g_mismatches" % (scale)] = mismatches.get(scale, 0)
+    return counts
+
+
+def test_tolerance_flattening_as_many_vertices_saves_nothing(capsys):
+    report = main.toleranceReport(toleranceCounts({}, {}))
+    assert report["tolerance"] == report["standard_tolerance"]
+    main.printTolerance("map.osu", report)
+    assert capsys.readouterr().out == "map.osu: no coarser tolerance puts the sliderball at the same positions with fewer vertices\n"
+
+
+def test_tolerance_flattening_fewer_vertices_is_picked(capsys):
+    report = main.toleranceReport(toleranceCounts({16: 200, 8: 250, 4: 300}, {16: 3}))
+    assert report["tolerance"][0] == 8*report["standard_tolerance"][0]
+    assert report["vertices"] == 250
+    main.printTolerance("map.osu", report)
+    assert "flattening 250 instead of 326 vertices" in capsys.readouterr().out
@@ -0,0 +1,82 @@
+import random
+
+import numpy
+import pytest
+
+from src.PathCache import PathCache
+from src.PathControlPoint import PathControlPoint
+from src.SliderPath import SliderPath
+import src.Profiler as Profiler
+
+
+def randomControlPoints(r, types):
+    controlPoints = []
+    for i in range(0, r.randint(1, 6)):
+        position = numpy.array((r.randint(0, 512), r.randint(0, 384)), dtype=numpy.int64)
+        controlPoints.append(PathControlPoint(position, r.choice((None,)+types) if i > 0 else r.choice(types)))
+    return controlPoints
+
+
+def line(points, expectedDistance=None):
+    controlPoints = [PathControlPoint(numpy.array(point, dtype=numpy.int64)) for point in points]
+    controlPoints[0].Type = PathControlPoint.LINEAR
+    return SliderPath(controlPoints, expectedDistance)
+
+
+def test_paths_do_not_share_state():
+    first = line([(0, 0), (30, 40)])
+    firstPath = first.calculatedPath.copy()
+    firstLengths = first.cumulativeLength.copy()
+
+    # Making another path, and changing its state, leaves the first one as it was
+    second = line([(100, 100), (100, 300), (300, 300)], 250)
+    second.calculatedPath[0] = (-1, -1)
+    second.cumulativeLength[-1] = -1
+    second.ControlPoints.append(PathControlPoint(numpy.array((0, 0), dtype=numpy.int64)))
+
+    assert numpy.array_equal(first.calculatedPath, firstPath)
+    assert numpy.array_equal(first.cumulativeLength, firstLengths)
+    assert len(first.ControlPoints) == 2
+    assert first.Distance() == 50
+    assert first.ExpectedDistance == None and second.ExpectedDistance == 250
+    for name in ('ControlPoints', 'calculatedPath', 'cumulativeLength'):
+        assert getattr(first, name) is not getattr(second, name)
+    assert not hasattr(first, "__dict__")
+
+    # Both are still usable side by side
+    assert numpy.array_equal(first.PositionAt(0.5), (15, 20))
+    assert numpy.array_equal(second.PositionAt(0), (-1, -1))
+    assert line([(100, 100), (100, 300), (300, 300)], 250).Distance() == 250
+
+
+@pytest.mark.parametrize("cache", [None, PathCache()])
+def test_single_and_batch_paths_agree_along_circular_arcs(cache):
+    r = random.Random(7)
+    controlPointSets = [randomControlPoints(r, (PathControlPoint.LINEAR, PathControlPoint.PERFECT)) for _ in range(0, 300)]
+    expectedDistances = [r.choice((None, r.uniform(1, 600))) for _ in controlPointSets]
+
+    # Twice, so that the second time the paths come from the cache if there is one
+    for _ in range(0, 2):
+        offsets, paths, cumulativeLengths, calculatedLengths = SliderPath.ComputeMany(controlPointSets, expectedDistances, cache)
+        for i in range(0, len(controlPointSets)):
+            path = SliderPath(controlPointSets[i], expectedDistances[i], cache)
+            assert numpy.array_equal(path.calculatedPath, paths[offsets[i]:offsets[i+1]])
+            assert numpy.array_equal(path.cumulativeLength, cumulativeLengths[offsets[i]:offsets[i+1]])
+            assert path.CalculatedDistance() == calculatedLengths[i]
+
+
+def test_path_cache_hits_are_counted():
+    cache = PathCache()
+    shape = [(0, 0), (40, 80), (120, 40)]
+    controlPointSets = []
+    for dx in (0, 100, 200):
+        controlPoints = [PathControlPoint(numpy.array((x+dx, y), dtype=numpy.int64)) for x, y in shape]
+        controlPoints[0].Type = PathControlPoint.BEZIER
+        controlPointSets.append(controlPoints)
+
+    with Profiler.Profiling() as profiler:
+        SliderPath.ComputeMany(controlPointSets[:1], [None], cache)
+        SliderPath.ComputeMany(controlPointSets, [None]*3, cache)
+    # The shape is flattened once and found again wherever it is
+    assert profiler.Counts == {"path_cache_hits": 3, "path_cache_misses": 1}
+    assert (cache.Hits, cache.Misses) == (3, 1)
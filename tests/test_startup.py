@@ -0,0 +1,12 @@
+import os
+
+import src.benchmark as benchmark
+
+CONFTEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conftest.py")
+
+
+# The threshold of the startup benchmark, so that a heavy import creeping into the converter fails the tests
+def test_importing_the_converter_is_light():
+    results = benchmark.benchmarkStartup(repeat=3, prelude="import runpy; runpy.run_path(%r)" % (CONFTEST))
+    assert results["heavy"] == []
+    assert results["import_ms"] <= benchmark.MAX_IMPORT_MS
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import src.main as main
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def readFixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf8") as FD:
+        return FD.read()
+
+
+def timingPoints(text):
+    section = text.split("[TimingPoints]\n")[1].split("\n\n")[0]
+    return section.split("\n")
+
+
+def convertFile(tmp_path, name, stream):
+    output = str(tmp_path/"output.osu")
+    main.convertFile(os.path.join(FIXTURES, name), output, stream=stream)
+    with open(output, encoding="utf8") as FD:
+        return FD.read()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_slider_before_first_timing_point(tmp_path, stream):
+    text = convertFile(tmp_path, "before-first-timing-point.osu", stream)
+    lines = timingPoints(text)
+
+    # Every slider line gets its four timing points, each a whole line of 8 fields
+    assert all(len(line.split(",")) == 8 for line in lines)
+    assert [line.split(",")[0] for line in lines] == ["399", "399", "400", "400", "599", "599", "600", "600", "1000",
+                                                      "1199", "1199", "1200", "1200", "1500"]
+    # The sliders before the first timing point are timed by it and take its settings
+    first = lines.index("1000,300,4,2,1,60,1,0")
+    assert all(line.endswith(",4,2,1,60,1,0") or line.endswith(",4,2,1,60,0,0") for line in lines[:first])
+    assert lines[2] == "400,3.000000000000000E+02,4,2,1,60,1,0"
+    assert lines[3] == "400,-1.000000000000000E+02,4,2,1,60,0,0"
+    assert text == main.convertBeatmap(readFixture("before-first-timing-point.osu"))
+
+
+# The expected files were written by the converter before the writer merged the slider timing points in, except for
+# before-first-timing-point.osu, which it could not convert.
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("name", ["inherited-points.osu", "coincident-times.osu", "before-first-timing-point.osu"])
+def test_output_matches_expected(tmp_path, name, stream):
+    output = str(tmp_path/"output.osu")
+    main.convertFile(os.path.join(FIXTURES, name), output, stream=stream)
+    with open(output, 'rb') as FD, open(os.path.join(FIXTURES, "expected", name), 'rb') as expected:
+        assert FD.read() == expected.read()